@@ -0,0 +1,117 @@
+# Databricks CLI
+# Copyright 2017 Databricks, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"), except
+# that the use of services to which certain application programming
+# interfaces (each, an "API") connect requires that the user first obtain
+# a license for the use of the APIs from Databricks, Inc. ("Databricks"),
+# by creating an account at www.databricks.com and agreeing to either (a)
+# the Community Edition Terms of Service, (b) the Databricks Terms of
+# Service, or (c) another written agreement between Licensee and Databricks
+# for the use of the APIs.
+#
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compares the CPU time and memory it takes to turn a local file into add-block request bodies,
+without sending them:
+
+  copying  reads each block, base64 encodes it and serializes a JSON request, as put_file did
+           before it encoded blocks into reusable buffers.
+  mapped   the current put_file path: blocks are read through a memory map and encoded in chunks
+           into reusable request bodies.
+
+Usage: python benchmarks/dbfs_upload.py [SIZE_MB]
+
+Each mode runs in its own process. Memory is the peak anonymous resident memory while encoding,
+sampled from /proc/self/status, so pages of the memory-mapped file itself are not counted.
+"""
+
+from __future__ import print_function
+
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from base64 import b64encode
+
+from databricks_cli.dbfs import api
+from databricks_cli.utils import prefetch
+
+MODES = ['copying', 'mapped']
+
+
+def _anonymous_rss_bytes():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('RssAnon:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def _copying_bodies(src_path, handle, block_size):
+    with open(src_path, 'rb') as local_file:
+        while True:
+            contents = local_file.read(block_size)
+            if len(contents) == 0:
+                return
+            yield len(contents), json.dumps({'handle': handle, 'data': b64encode(contents)})
+
+
+def _mapped_bodies(src_path, handle, block_size):
+    block_sizer = api.BlockSizer(block_size, block_size)
+    blocks = api._map_file_blocks(src_path, 0, block_sizer)
+    for data, body in api._encode_blocks(blocks, handle, block_sizer):
+        yield len(data), body
+
+
+def run(mode, src_path):
+    bodies = {'copying': _copying_bodies, 'mapped': _mapped_bodies}[mode]
+    baseline = _anonymous_rss_bytes()
+    peak = baseline
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    start_time = time.time()
+    total_bytes = 0
+    for num_bytes, body in prefetch(bodies(src_path, 1, api.BUFFER_SIZE_BYTES),
+                                    api.UPLOAD_PIPELINE_DEPTH):
+        total_bytes += num_bytes
+        assert len(body) > num_bytes
+        peak = max(peak, _anonymous_rss_bytes())
+    elapsed = time.time() - start_time
+    end_usage = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = (end_usage.ru_utime - usage.ru_utime) + (end_usage.ru_stime - usage.ru_stime)
+    gigabytes = float(total_bytes) / 2**30
+    print('{:8} {:10.2f} {:12.2f} {:14.1f}'.format(
+        mode, cpu / gigabytes, elapsed / gigabytes, (peak - baseline) / 2.0**20))
+
+
+def main():
+    if len(sys.argv) == 3:
+        run(sys.argv[1], sys.argv[2])
+        return
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    src = tempfile.NamedTemporaryFile(suffix='.bin')
+    for _ in range(size_mb):
+        src.write(os.urandom(2**20))
+    src.flush()
+    print('Encoding {} MB into add-block requests'.format(size_mb))
+    print('{:8} {:>10} {:>12} {:>14}'.format('mode', 'CPU s/GB', 'wall s/GB', 'peak heap MB'))
+    for mode in MODES:
+        subprocess.check_call([sys.executable, __file__, mode, src.name])
+    src.close()
+
+
+if __name__ == '__main__':
+    main()
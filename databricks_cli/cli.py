@@ -26,7 +26,7 @@ import click
 from databricks_cli.libraries.cli import libraries_group
 from databricks_cli.version import print_version_callback, version
 from databricks_cli.utils import CONTEXT_SETTINGS
-from databricks_cli.configure.cli import configure_cli
+from databricks_cli.configure.cli import configure_cli, api_client_options
 from databricks_cli.dbfs.cli import dbfs_group
 from databricks_cli.workspace.cli import workspace_group
 from databricks_cli.jobs.cli import jobs_group
@@ -37,6 +37,7 @@ from databricks_cli.runs.cli import runs_group
 @click.group(context_settings=CONTEXT_SETTINGS)
 @click.option('--version', '-v', is_flag=True, callback=print_version_callback,
               expose_value=False, is_eager=True, help=version)
+@api_client_options
 def cli():
     pass
 
@@ -26,7 +26,8 @@ import click
 from click import ParamType
 
 from databricks_cli.utils import CONTEXT_SETTINGS
-from databricks_cli.configure.config import DatabricksConfig
+from databricks_cli.configure.config import DatabricksConfig, set_client_option, POOL_SIZE, \
+    POOL_BLOCK, POOL_IDLE_TIMEOUT, RETRY_MAX_ATTEMPTS, RATE_LIMIT, CACHE
 
 
 PROMPT_HOST = 'Databricks Host (should begin with https://)'
@@ -72,6 +73,43 @@ def configure_cli(token):
         _configure_cli_password()
 
 
+def _client_option_callback(key):
+    def callback(ctx, param, value): #  NOQA
+        if value is not None:
+            set_client_option(key, value)
+    return callback
+
+
+def api_client_options(function):
+    """
+    Adds the flags that tune how the CLI talks to the Databricks API to a command group.
+    """
+    options = [
+        click.option('--pool-size', type=int, expose_value=False,
+                     callback=_client_option_callback(POOL_SIZE),
+                     help='Number of connections to keep open. Defaults to the number of '
+                          'concurrent requests the command makes.'),
+        click.option('--pool-block/--no-pool-block', default=None, expose_value=False,
+                     callback=_client_option_callback(POOL_BLOCK),
+                     help='Wait for a free connection when the pool is exhausted.'),
+        click.option('--pool-idle-timeout', type=float, expose_value=False,
+                     callback=_client_option_callback(POOL_IDLE_TIMEOUT),
+                     help='Seconds after which idle connections are closed.'),
+        click.option('--retry-max-attempts', type=int, expose_value=False,
+                     callback=_client_option_callback(RETRY_MAX_ATTEMPTS),
+                     help='Number of times a throttled or failed request is attempted.'),
+        click.option('--rate-limit', type=float, expose_value=False,
+                     callback=_client_option_callback(RATE_LIMIT),
+                     help='Maximum number of requests sent per second.'),
+        click.option('--cache/--no-cache', default=None, expose_value=False,
+                     callback=_client_option_callback(CACHE),
+                     help='Serve rarely changing API responses from the local cache.'),
+    ]
+    for option in reversed(options):
+        function = option(function)
+    return function
+
+
 class _DbfsHost(ParamType):
     """
     Used to validate the configured host
@@ -22,16 +22,21 @@
 # limitations under the License.
 
 import ConfigParser
+import atexit
+import importlib
 import sys
+import threading
 import os
-
 from os.path import expanduser, join
 
 import six
+from requests.adapters import DEFAULT_POOLSIZE
 
 from databricks_cli.utils import error_and_quit
 from databricks_cli.sdk import ApiClient, DbfsService, WorkspaceService, JobsService, \
-    ClusterService, ManagedLibraryService
+    ClusterService, ManagedLibraryService, RetryPolicy, RateLimiter, ResponseCache
+from databricks_cli.sdk.cache import DEFAULT_TTLS, parse_ttls
+from databricks_cli.sdk.rate_limiter import parse_endpoint_limits
 
 DEFAULT_SECTION = 'DEFAULT'
 HOST = 'host'
@@ -39,6 +44,35 @@ USERNAME = 'username'
 PASSWORD = 'password' #  NOQA
 TOKEN = 'token'
 
+# Optional ApiClient settings. Each one can be set in ~/.databrickscfg, through the environment
+# variable of the same name in upper case with a DATABRICKS_ prefix (e.g. DATABRICKS_POOL_SIZE)
+# or through a command line flag, in increasing order of precedence.
+POOL_SIZE = 'pool_size'
+POOL_BLOCK = 'pool_block'
+POOL_IDLE_TIMEOUT = 'pool_idle_timeout'
+RETRY_MAX_ATTEMPTS = 'retry_max_attempts'
+RETRY_BACKOFF_BASE = 'retry_backoff_base'
+RETRY_BACKOFF_CAP = 'retry_backoff_cap'
+RETRY_JITTER = 'retry_jitter'
+RATE_LIMIT = 'rate_limit'
+RATE_LIMIT_BURST = 'rate_limit_burst'
+RATE_LIMIT_ENDPOINTS = 'rate_limit_endpoints'
+COMPRESS_REQUEST_ENDPOINTS = 'compress_request_endpoints'
+COMPRESS_MIN_BYTES = 'compress_min_bytes'
+UNCOMPRESSED_RESPONSE_ENDPOINTS = 'uncompressed_response_endpoints'
+CACHE = 'cache'
+CACHE_DIR = 'cache_dir'
+CACHE_MAX_BYTES = 'cache_max_bytes'
+CACHE_TTLS = 'cache_ttls'
+REQUEST_HOOKS = 'request_hooks'
+
+# Optional DBFS transfer settings, looked up the same way.
+DBFS_MIN_BLOCK_SIZE = 'dbfs_min_block_size'
+DBFS_MAX_BLOCK_SIZE = 'dbfs_max_block_size'
+DBFS_CACHE_DIR = 'dbfs_cache_dir'
+DBFS_CACHE_MAX_BYTES = 'dbfs_cache_max_bytes'
+ENV_PREFIX = 'DATABRICKS_'
+
 
 def require_config(function):
     @six.wraps(function)
@@ -52,11 +86,194 @@ def require_config(function):
     return decorator
 
 
-def _get_api_client():
-    conf = DatabricksConfig.fetch_from_fs()
+# Options set from the command line and the number of API calls the running command makes at once.
+_client_options = {}
+_concurrency = [1]
+
+
+def set_client_option(key, value):
+    """
+    Overrides an ApiClient setting for the rest of the process.
+    """
+    _client_options[key] = value
+
+
+def set_concurrency(concurrency):
+    """
+    Records how many API calls the running command makes at once. Unless pool_size is set
+    explicitly, the connection pool is sized to match.
+    """
+    _concurrency[0] = concurrency
+
+
+def _to_bool(value):
+    if isinstance(value, bool):
+        return value
+    return value.lower() in ('true', 'yes', 'on', '1')
+
+
+def get_client_option(conf, key, convert=str, default=None):
+    """
+    Looks up an ApiClient setting on the command line, in the environment and then in the
+    config file. Returns default if it is set in none of them.
+    """
+    if _client_options.get(key) is not None:
+        value = _client_options[key]
+    else:
+        value = os.environ.get(ENV_PREFIX + key.upper(), conf.get_option(key))
+    if value is None:
+        return default
+    return convert(value)
+
+
+def _to_list(value):
+    return tuple(prefix.strip() for prefix in value.split(',') if prefix.strip())
+
+
+def _get_client_settings(conf):
+    return {
+        'pool_maxsize': get_client_option(conf, POOL_SIZE, int,
+                                          max(DEFAULT_POOLSIZE, _concurrency[0])),
+        'pool_block': get_client_option(conf, POOL_BLOCK, _to_bool, False),
+        'pool_idle_timeout': get_client_option(conf, POOL_IDLE_TIMEOUT, float),
+        'retry_max_attempts': get_client_option(conf, RETRY_MAX_ATTEMPTS, int, 5),
+        'retry_backoff_base': get_client_option(conf, RETRY_BACKOFF_BASE, float, 0.5),
+        'retry_backoff_cap': get_client_option(conf, RETRY_BACKOFF_CAP, float, 30.0),
+        'retry_jitter': get_client_option(conf, RETRY_JITTER, _to_bool, True),
+        'rate_limit': get_client_option(conf, RATE_LIMIT, float),
+        'rate_limit_burst': get_client_option(conf, RATE_LIMIT_BURST, float),
+        'rate_limit_endpoints': get_client_option(conf, RATE_LIMIT_ENDPOINTS),
+        'compress_request_paths': get_client_option(conf, COMPRESS_REQUEST_ENDPOINTS,
+                                                    _to_list, ()),
+        'compress_min_bytes': get_client_option(conf, COMPRESS_MIN_BYTES, int, 1024),
+        'uncompressed_response_paths': get_client_option(conf, UNCOMPRESSED_RESPONSE_ENDPOINTS,
+                                                         _to_list, ()),
+        'cache': get_client_option(conf, CACHE, _to_bool, False),
+        'cache_dir': get_client_option(conf, CACHE_DIR, expanduser,
+                                       join(DatabricksConfig.home, '.databricks', 'cache')),
+        'cache_max_bytes': get_client_option(conf, CACHE_MAX_BYTES, int, 64 * 2**20),
+        'cache_ttls': get_client_option(conf, CACHE_TTLS),
+        'request_hooks': get_client_option(conf, REQUEST_HOOKS, _to_list, ()),
+    }
+
+
+def _load_hook(spec):
+    """
+    Instantiates the RequestHook class named by spec, written as module:ClassName.
+    """
+    module_name, attribute = spec.split(':')
+    return getattr(importlib.import_module(module_name), attribute)()
+
+
+def _create_api_client(conf, settings):
+    retry_policy = RetryPolicy(max_attempts=settings['retry_max_attempts'],
+                               backoff_base=settings['retry_backoff_base'],
+                               backoff_cap=settings['retry_backoff_cap'],
+                               jitter=settings['retry_jitter'])
+    rate_limiter = None
+    if settings['rate_limit'] or settings['rate_limit_endpoints']:
+        endpoint_limits = parse_endpoint_limits(settings['rate_limit_endpoints'] or '')
+        rate_limiter = RateLimiter(settings['rate_limit'], settings['rate_limit_burst'],
+                                   endpoint_limits)
+    cache = None
+    if settings['cache']:
+        ttls = dict(DEFAULT_TTLS)
+        ttls.update(parse_ttls(settings['cache_ttls'] or ''))
+        cache = ResponseCache(ttls, settings['cache_dir'],
+                              max_disk_bytes=settings['cache_max_bytes'])
+    kwargs = {
+        'pool_maxsize': settings['pool_maxsize'],
+        'pool_block': settings['pool_block'],
+        'pool_idle_timeout': settings['pool_idle_timeout'],
+        'retry_policy': retry_policy,
+        'rate_limiter': rate_limiter,
+        'compress_request_paths': settings['compress_request_paths'],
+        'compress_min_bytes': settings['compress_min_bytes'],
+        'uncompressed_response_paths': settings['uncompressed_response_paths'],
+        'cache': cache,
+        'hooks': [_load_hook(spec) for spec in settings['request_hooks']],
+    }
     if conf.is_valid_with_token:
-        return ApiClient(host=conf.host, token=conf.token)
-    return ApiClient(user=conf.username, password=conf.password, host=conf.host)
+        return ApiClient(host=conf.host, token=conf.token, **kwargs)
+    return ApiClient(user=conf.username, password=conf.password, host=conf.host, **kwargs)
+
+
+# ApiClients are shared for the life of the process so that every call made with the same
+# credentials reuses one connection pool instead of doing a new TCP and TLS handshake.
+_api_clients = {}
+_api_clients_lock = threading.Lock()
+# The parsed config file, keyed on its path, modification time and size, and the settings derived
+# from it, keyed on everything else they depend on. Commands that make thousands of calls thus
+# parse ~/.databrickscfg once instead of once per call.
+_config_cache = {}
+_settings_cache = {}
+
+
+def _get_config_key():
+    path = DatabricksConfig.get_path()
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return path, None, None
+    return path, stat.st_mtime, stat.st_size
+
+
+def get_config():
+    """
+    Returns the DatabricksConfig in ~/.databrickscfg. The file is parsed again only once it
+    changes. The returned config is shared and should not be modified.
+    """
+    config_key = _get_config_key()
+    with _api_clients_lock:
+        conf = _config_cache.get(config_key)
+        if conf is None:
+            conf = DatabricksConfig.fetch_from_fs()
+            _config_cache.clear()
+            _config_cache[config_key] = conf
+    return conf
+
+
+def _get_settings_key():
+    environment = tuple(sorted(item for item in os.environ.items()
+                               if item[0].startswith(ENV_PREFIX)))
+    return (_get_config_key(), tuple(sorted(_client_options.items())), _concurrency[0],
+            environment)
+
+
+def _get_api_client():
+    settings_key = _get_settings_key()
+    with _api_clients_lock:
+        cached = _settings_cache.get(settings_key)
+    if cached is None:
+        conf = get_config()
+        settings = _get_client_settings(conf)
+        key = (conf.host, conf.username, conf.password, conf.token) + \
+            tuple(sorted(settings.items()))
+        cached = conf, settings, key
+        with _api_clients_lock:
+            _settings_cache[settings_key] = cached
+    conf, settings, key = cached
+    with _api_clients_lock:
+        api_client = _api_clients.get(key)
+        if api_client is None:
+            api_client = _create_api_client(conf, settings)
+            _api_clients[key] = api_client
+    return api_client
+
+
+def close_api_clients():
+    """
+    Closes every shared ApiClient and releases their connection pools. Called at exit.
+    """
+    with _api_clients_lock:
+        for api_client in _api_clients.values():
+            api_client.close()
+        _api_clients.clear()
+        _config_cache.clear()
+        _settings_cache.clear()
+
+
+atexit.register(close_api_clients)
 
 
 def get_dbfs_client():
@@ -127,6 +344,11 @@ class DatabricksConfig(object):
     def token(self):
         return self._config.get(DEFAULT_SECTION, TOKEN) if self.is_valid_with_token else None
 
+    def get_option(self, key):
+        if self._config.has_option(DEFAULT_SECTION, key):
+            return self._config.get(DEFAULT_SECTION, key)
+        return None
+
     @classmethod
     def fetch_from_fs(cls):
         databricks_config = cls()
@@ -23,16 +23,44 @@
 
 from base64 import b64encode, b64decode
 
+import binascii
+import hashlib
+import json
+import mmap
 import os
+import threading
+import time
 import click
 
-from requests.exceptions import HTTPError
-from databricks_cli.utils import error_and_quit
-from databricks_cli.configure.config import get_dbfs_client
+from requests.exceptions import HTTPError, RequestException
+from databricks_cli.utils import error_and_quit, prefetch, parallel_map, bounded_map, \
+    mkdirs_leaf_directories
+from databricks_cli.configure.config import get_dbfs_client, get_client_option, \
+    get_config, DatabricksConfig, DBFS_MIN_BLOCK_SIZE, DBFS_MAX_BLOCK_SIZE, DBFS_CACHE_DIR, \
+    DBFS_CACHE_MAX_BYTES
+from databricks_cli.files import make_dirs, replace_file, remove_file
+from databricks_cli.dbfs.cache import DownloadCache, DEFAULT_MAX_BYTES as DEFAULT_CACHE_MAX_BYTES
 from databricks_cli.dbfs.dbfs_path import DbfsPath
-from databricks_cli.dbfs.exceptions import LocalFileExistsException
+from databricks_cli.dbfs.exceptions import LocalFileExistsException, DbfsFileExistsException
 
+# Largest block accepted by /dbfs/add-block and /dbfs/read.
 BUFFER_SIZE_BYTES = 2**20
+# Smallest block size the transfers adapt down to by default.
+MIN_BLOCK_SIZE_BYTES = 2**16
+# Number of blocks read and encoded ahead of the one being uploaded.
+UPLOAD_PIPELINE_DEPTH = 4
+# Files up to this size are uploaded with a single /dbfs/put call instead of create, add-block
+# and close. /dbfs/put accepts at most 1 MB of contents.
+SMALL_FILE_THRESHOLD_BYTES = 2**19
+# Largest range of a file fetched by one stream of a parallel download, and the number of times
+# a range is attempted before the download fails.
+RANGE_SIZE_BYTES = 2**24
+RANGE_ATTEMPTS = 3
+# Number of blocks that iter_file reads concurrently ahead of its caller.
+READ_AHEAD_BLOCKS = 4
+# Raw bytes encoded at a time into the body of an add-block request. A multiple of 3, so that the
+# encoded chunks can be concatenated without padding in between.
+ENCODE_CHUNK_BYTES = 3 * 2**14
 
 
 class FileInfo(object):
@@ -50,9 +78,9 @@ class FileInfo(object):
         return [stylized_path]
 
     @classmethod
-    def from_json(cls, json):
-        dbfs_path = DbfsPath.from_api_path(json['path'])
-        return cls(dbfs_path, json['is_dir'], json['file_size'])
+    def from_json(cls, file_json):
+        dbfs_path = DbfsPath.from_api_path(file_json['path'])
+        return cls(dbfs_path, file_json['is_dir'], file_json['file_size'])
 
     def __eq__(self, other):
         if isinstance(other, self.__class__):
@@ -65,6 +93,75 @@ class FileInfo(object):
 class DbfsErrorCodes(object):
     RESOURCE_DOES_NOT_EXIST = 'RESOURCE_DOES_NOT_EXIST'
     RESOURCE_ALREADY_EXISTS = 'RESOURCE_ALREADY_EXISTS'
+    MAX_BLOCK_SIZE_EXCEEDED = 'MAX_BLOCK_SIZE_EXCEEDED'
+    MAX_READ_SIZE_EXCEEDED = 'MAX_READ_SIZE_EXCEEDED'
+
+
+def get_error_code(http_error):
+    try:
+        return http_error.response.json().get('error_code')
+    except ValueError:
+        return None
+
+
+class BlockSizer(object):
+    """
+    Picks the size of the next block of a transfer from the throughput observed so far, so that
+    each request takes about target_seconds. Fast links therefore use the largest blocks allowed
+    and slow or flaky ones smaller blocks that are cheaper to retry. The size stays within
+    [min_size, max_size] and max_size is lowered if the server rejects a block as too large.
+    """
+    ALIGNMENT = 3 * 2**10
+
+    def __init__(self, min_size, max_size, target_seconds=2.0):
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.target_seconds = target_seconds
+        self.block_size = max_size
+        self._throughput = None
+
+    def record(self, num_bytes, elapsed):
+        throughput = num_bytes / max(elapsed, 1e-3)
+        if self._throughput is None:
+            self._throughput = throughput
+        else:
+            self._throughput = 0.7 * self._throughput + 0.3 * throughput
+        size = int(self._throughput * self.target_seconds) // self.ALIGNMENT * self.ALIGNMENT
+        self.block_size = max(self.min_size, min(self.max_size, size))
+
+    def limit(self, max_size):
+        self.max_size = max(1, max_size)
+        self.min_size = min(self.min_size, self.max_size)
+        self.block_size = min(self.block_size, self.max_size)
+
+
+class TransferStats(object):
+    """
+    Statistics of a single file transfer, including the block size it settled on.
+    """
+    def __init__(self):
+        self.bytes = 0
+        self.blocks = 0
+        self.elapsed = 0.0
+        self.block_size = None
+
+    def record(self, num_bytes, elapsed, block_size):
+        self.bytes += num_bytes
+        self.blocks += 1
+        self.elapsed += elapsed
+        self.block_size = block_size
+
+    @property
+    def throughput(self):
+        return self.bytes / self.elapsed if self.elapsed else 0.0
+
+
+def create_block_sizer():
+    conf = get_config()
+    max_size = min(BUFFER_SIZE_BYTES,
+                   get_client_option(conf, DBFS_MAX_BLOCK_SIZE, int, BUFFER_SIZE_BYTES))
+    min_size = get_client_option(conf, DBFS_MIN_BLOCK_SIZE, int, MIN_BLOCK_SIZE_BYTES)
+    return BlockSizer(min_size, max_size)
 
 
 def list_files(dbfs_path):
@@ -88,38 +185,568 @@ def file_exists(dbfs_path):
 
 def get_status(dbfs_path):
     dbfs_api = get_dbfs_client()
-    json = dbfs_api.get_status(dbfs_path.absolute_path)
-    return FileInfo.from_json(json)
+    response = dbfs_api.get_status(dbfs_path.absolute_path)
+    return FileInfo.from_json(response)
+
+
+class BlockBody(object):
+    """
+    Reusable request body of /dbfs/add-block. Blocks are base64 encoded in chunks straight into
+    a buffer preallocated for the largest block, so that sending a block does not allocate a
+    copy of it for every encoding step.
+    """
+    SUFFIX = '"}'
+
+    def __init__(self, handle, max_block_size):
+        self.prefix = '{{"handle": {}, "data": "'.format(json.dumps(handle))
+        # The encoded block, plus the newline binascii appends to the last chunk.
+        size = len(self.prefix) + (max_block_size + 2) // 3 * 4 + 1 + len(self.SUFFIX)
+        self._view = memoryview(bytearray(size))
+        self._view[:len(self.prefix)] = self.prefix
+
+    def fill(self, data):
+        """
+        Encodes data, a buffer of raw bytes, and returns a memoryview of the resulting body.
+        """
+        end = len(self.prefix)
+        for start in range(0, len(data), ENCODE_CHUNK_BYTES):
+            encoded = binascii.b2a_base64(data[start:start + ENCODE_CHUNK_BYTES])
+            self._view[end:end + len(encoded)] = encoded
+            end += len(encoded) - 1
+        self._view[end:end + len(self.SUFFIX)] = self.SUFFIX
+        return self._view[:end + len(self.SUFFIX)]
+
+
+def _map_file_blocks(src_path, offset, block_sizer):
+    """
+    Yields the blocks of src_path from offset on as buffers into a read-only memory map of the
+    file.
+    """
+    with open(src_path, 'rb') as local_file:
+        size = os.fstat(local_file.fileno()).st_size
+        if size <= offset:
+            return
+        # Blocks may still be in flight when the generator is closed, so the map is not closed
+        # explicitly. It is unmapped once the last buffer into it is garbage collected.
+        contents = mmap.mmap(local_file.fileno(), 0, access=mmap.ACCESS_READ)
+    while offset < size:
+        num_bytes = min(block_sizer.block_size, size - offset)
+        yield buffer(contents, offset, num_bytes)
+        offset += num_bytes
+
+
+def _read_stream_blocks(source, block_sizer):
+    """
+    Yields the blocks of source, a file-like object or an iterable of byte strings. Chunks of an
+    iterable are joined and split into blocks of the current block size.
+    """
+    if hasattr(source, 'read'):
+        for data in iter(lambda: source.read(block_sizer.block_size), b''):
+            yield data
+        return
+    pending = bytearray()
+    for chunk in source:
+        pending += chunk
+        while len(pending) >= block_sizer.block_size:
+            block_size = block_sizer.block_size
+            yield bytes(pending[:block_size])
+            del pending[:block_size]
+    if pending:
+        yield bytes(pending)
+
+
+def _encode_blocks(blocks, handle, block_sizer):
+    """
+    Yields (data, body) for each of the raw blocks, where body is the encoded add-block request.
+
+    Bodies are taken round robin from UPLOAD_PIPELINE_DEPTH + 2 buffers. When prefetch hands out
+    a block, at most UPLOAD_PIPELINE_DEPTH later ones are queued, so the block that last used
+    the same buffer has been sent already.
+
+    The block sizer may be limited between reading a block and encoding it, so every buffer is
+    sized for the largest block the sizer allowed when the upload started.
+    """
+    max_block_size = block_sizer.max_size
+    bodies = [None] * (UPLOAD_PIPELINE_DEPTH + 2)
+    index = 0
+    for data in blocks:
+        if bodies[index] is None:
+            bodies[index] = BlockBody(handle, max_block_size)
+        yield data, bodies[index].fill(data)
+        index = (index + 1) % len(bodies)
+
+
+def _add_block(dbfs_api, handle, data, body, block_sizer):
+    """
+    Sends the encoded body of the raw block data, splitting the block in two if the server
+    rejects it as too large.
+    """
+    try:
+        dbfs_api.client.perform_query('POST', '/dbfs/add-block', data=body)
+    except HTTPError as e:
+        if len(data) <= 1 or get_error_code(e) != DbfsErrorCodes.MAX_BLOCK_SIZE_EXCEEDED:
+            raise e
+        split = len(data) // 2
+        block_sizer.limit(split)
+        for half in (buffer(data, 0, split), buffer(data, split)):
+            _add_block(dbfs_api, handle, half, BlockBody(handle, len(half)).fill(half),
+                       block_sizer)
+
+
+def _upload_blocks(dbfs_api, handle, blocks, block_sizer, on_block=None):
+    """
+    Uploads the raw blocks to the open handle and returns the TransferStats. The next blocks are
+    read and encoded in the background while the current one is sent. on_block is called with
+    the size of each block once the server has accepted it.
+    """
+    stats = TransferStats()
+    for data, body in prefetch(_encode_blocks(blocks, handle, block_sizer), UPLOAD_PIPELINE_DEPTH):
+        start_time = time.time()
+        _add_block(dbfs_api, handle, data, body, block_sizer)
+        elapsed = time.time() - start_time
+        stats.record(len(data), elapsed, block_sizer.block_size)
+        block_sizer.record(len(data), elapsed)
+        if on_block is not None:
+            on_block(len(data))
+    return stats
 
 
 def put_file(src_path, dbfs_path, overwrite):
+    """
+    Uploads src_path block by block and returns its TransferStats. Small files are uploaded in a
+    single request.
+    """
     dbfs_api = get_dbfs_client()
+    if os.path.getsize(src_path) <= SMALL_FILE_THRESHOLD_BYTES:
+        with open(src_path, 'rb') as local_file:
+            contents = local_file.read(SMALL_FILE_THRESHOLD_BYTES + 1)
+        if len(contents) <= SMALL_FILE_THRESHOLD_BYTES:
+            stats = TransferStats()
+            start_time = time.time()
+            dbfs_api.put(dbfs_path.absolute_path, b64encode(contents), overwrite)
+            stats.record(len(contents), time.time() - start_time, len(contents))
+            return stats
+    block_sizer = create_block_sizer()
     handle = dbfs_api.create(dbfs_path.absolute_path, overwrite)['handle']
-    with open(src_path, 'rb') as local_file:
+    stats = _upload_blocks(dbfs_api, handle, _map_file_blocks(src_path, 0, block_sizer),
+                           block_sizer)
+    dbfs_api.close(handle)
+    return stats
+
+
+def put_stream(source, dbfs_path, overwrite):
+    """
+    Uploads the contents of source, a file-like object or an iterable of byte strings such as a
+    generator, and returns the TransferStats. source is consumed block by block, so the upload
+    runs in constant memory whatever its size.
+    """
+    dbfs_api = get_dbfs_client()
+    block_sizer = create_block_sizer()
+    handle = dbfs_api.create(dbfs_path.absolute_path, overwrite)['handle']
+    stats = _upload_blocks(dbfs_api, handle, _read_stream_blocks(source, block_sizer),
+                           block_sizer)
+    dbfs_api.close(handle)
+    return stats
+
+
+def _get_journal_path(src_path, dbfs_path):
+    key = hashlib.sha1(os.path.abspath(src_path) + '\0' + dbfs_path.absolute_path).hexdigest()
+    return os.path.join(DatabricksConfig.home, '.databricks', 'uploads', key + '.json')
+
+
+def _load_journal(journal_path):
+    try:
+        with open(journal_path, 'r') as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return None
+
+
+def _save_journal(journal_path, journal):
+    make_dirs(os.path.dirname(journal_path))
+    tmp_path = journal_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(journal, f)
+    replace_file(tmp_path, journal_path)
+
+
+def _start_staged_upload(dbfs_api, journal_path, source, dbfs_path):
+    staging_path = '{}.upload-{}'.format(dbfs_path.absolute_path,
+                                         os.path.basename(journal_path)[:12])
+    handle = dbfs_api.create(staging_path, True)['handle']
+    journal = dict(source, staging_path=staging_path, handle=handle, offset=0)
+    _save_journal(journal_path, journal)
+    return journal
+
+
+def _upload_from_journal(dbfs_api, src_path, journal_path, journal):
+    def on_block(num_bytes):
+        journal['offset'] += num_bytes
+        _save_journal(journal_path, journal)
+
+    block_sizer = create_block_sizer()
+    blocks = _map_file_blocks(src_path, journal['offset'], block_sizer)
+    stats = _upload_blocks(dbfs_api, journal['handle'], blocks, block_sizer, on_block)
+    if not journal.get('closed'):
+        dbfs_api.close(journal['handle'])
+        journal['closed'] = True
+        _save_journal(journal_path, journal)
+    return stats
+
+
+def put_file_resumable(src_path, dbfs_path, overwrite):
+    """
+    Uploads src_path so that an interrupted upload can be resumed by calling this function again.
+
+    The file is uploaded to a staging path next to dbfs_path and moved into place once complete.
+    A local journal under ~/.databricks/uploads records the identity of the source file, the
+    upload handle and the number of bytes confirmed so far. If the journal matches the source
+    file and its handle is still open on the server, the upload continues from the confirmed
+    offset. Otherwise it starts over. Returns the TransferStats of this run.
+    """
+    if not overwrite and file_exists(dbfs_path):
+        raise DbfsFileExistsException('{} exists already.'.format(repr(dbfs_path)))
+    dbfs_api = get_dbfs_client()
+    stat = os.stat(src_path)
+    source = {'source': os.path.abspath(src_path), 'size': stat.st_size, 'mtime': stat.st_mtime}
+    journal_path = _get_journal_path(src_path, dbfs_path)
+    journal = _load_journal(journal_path)
+    if journal is not None and all(journal.get(key) == value for key, value in source.items()):
+        try:
+            stats = _upload_from_journal(dbfs_api, src_path, journal_path, journal)
+        except HTTPError as e:
+            if e.response.status_code >= 500:
+                raise e
+            # The handle of the interrupted upload is no longer valid. Start over.
+            journal = _start_staged_upload(dbfs_api, journal_path, source, dbfs_path)
+            stats = _upload_from_journal(dbfs_api, src_path, journal_path, journal)
+    else:
+        journal = _start_staged_upload(dbfs_api, journal_path, source, dbfs_path)
+        stats = _upload_from_journal(dbfs_api, src_path, journal_path, journal)
+
+    staging_path = DbfsPath(journal['staging_path'])
+    if get_status(staging_path).file_size != source['size']:
+        delete(staging_path, False)
+        remove_file(journal_path)
+        raise RuntimeError('The upload of {} to {} is corrupt. Please retry.'.format(
+            src_path, repr(dbfs_path)))
+    if overwrite and file_exists(dbfs_path):
+        delete(dbfs_path, False)
+    move(staging_path, dbfs_path)
+    remove_file(journal_path)
+    return stats
+
+
+def _read_blocks(dbfs_api, dbfs_path, offset, length, stats):
+    """
+    Yields the decoded contents of dbfs_path from offset up to length block by block and records
+    each block in stats.
+    """
+    block_sizer = create_block_sizer()
+    while offset < length:
+        chosen_size = block_sizer.block_size
+        block_size = min(chosen_size, length - offset)
+        start_time = time.time()
+        try:
+            response = dbfs_api.read(dbfs_path.absolute_path, offset, block_size)
+        except HTTPError as e:
+            if block_size <= 1 or get_error_code(e) != DbfsErrorCodes.MAX_READ_SIZE_EXCEEDED:
+                raise e
+            block_sizer.limit(block_size // 2)
+            continue
+        elapsed = time.time() - start_time
+        bytes_read = response['bytes_read']
+        offset += bytes_read
+        block_sizer.record(bytes_read, elapsed)
+        stats.record(bytes_read, elapsed, chosen_size)
+        yield b64decode(response['data'])
+
+
+def _get_ranges(length, streams):
+    """
+    Splits length bytes into ranges of whole blocks for a download with streams concurrent
+    requests, each at most RANGE_SIZE_BYTES long.
+    """
+    if length == 0:
+        return []
+    range_size = -(-length // streams)
+    range_size = min(RANGE_SIZE_BYTES, -(-range_size // BUFFER_SIZE_BYTES) * BUFFER_SIZE_BYTES)
+    return [(start, min(start + range_size, length)) for start in range(0, length, range_size)]
+
+
+def _download_range(dbfs_api, dbfs_path, dst_path, start, end):
+    """
+    Downloads the bytes [start, end) of dbfs_path into place in dst_path and returns the
+    TransferStats of the range. If a request fails, the rest of the range is requested again,
+    up to RANGE_ATTEMPTS times in all.
+    """
+    stats = TransferStats()
+    offset = start
+    attempt = 0
+    # Python 2 has no positional writes, so every range seeks its own file object.
+    with open(dst_path, 'r+b') as local_file:
+        local_file.seek(start)
         while True:
-            contents = local_file.read(BUFFER_SIZE_BYTES)
-            if len(contents) == 0:
-                break
-            dbfs_api.add_block(handle, b64encode(contents))
-        dbfs_api.close(handle)
+            attempt += 1
+            try:
+                for data in _read_blocks(dbfs_api, dbfs_path, offset, end, stats):
+                    local_file.write(data)
+                    offset += len(data)
+                return stats
+            except RequestException:
+                if attempt >= RANGE_ATTEMPTS:
+                    raise
 
 
-def get_file(dbfs_path, dst_path, overwrite):
+def _start_partial_download(part_path, journal_path, file_size):
+    """
+    Returns the journal of the partial download in part_path, continuing the one left by an
+    earlier run if the source still has file_size bytes and starting a new one otherwise.
+
+    The journal records the size of the source and the ranges of part_path that are complete.
+    Unless part_path was preallocated for ranged downloads, it holds a prefix of the file and
+    its length is how much of it is complete.
+    """
+    journal = _load_journal(journal_path)
+    if journal and journal.get('size') == file_size and os.path.isfile(part_path):
+        if not journal['preallocated']:
+            journal['done'] = [[0, min(os.path.getsize(part_path), file_size)]]
+        return journal
+    journal = {'size': file_size, 'preallocated': False, 'done': []}
+    open(part_path, 'wb').close()
+    _save_journal(journal_path, journal)
+    return journal
+
+
+def _get_missing_ranges(done, file_size):
+    missing = []
+    offset = 0
+    for start, end in sorted(done):
+        if start > offset:
+            missing.append((offset, start))
+        offset = max(offset, end)
+    if offset < file_size:
+        missing.append((offset, file_size))
+    return missing
+
+
+def _get_download_ranges(done, file_size, streams):
+    """
+    Returns the ranges of the parts of a file_size bytes long file that are not done, split for a
+    download with streams concurrent requests.
+    """
+    return [(start + range_start, start + range_end)
+            for start, end in _get_missing_ranges(done, file_size)
+            for range_start, range_end in _get_ranges(end - start, streams)]
+
+
+def _download_to_end(dbfs_api, dbfs_path, part_path, offset, file_size):
+    """
+    Downloads dbfs_path from offset on to the same offset in part_path, which is truncated
+    there first, and returns the TransferStats.
+    """
+    stats = TransferStats()
+    with open(part_path, 'r+b') as local_file:
+        local_file.seek(offset)
+        local_file.truncate()
+        for data in _read_blocks(dbfs_api, dbfs_path, offset, file_size, stats):
+            local_file.write(data)
+    return stats
+
+
+def _download_file(dbfs_api, dbfs_path, file_size, dst_path, streams):
+    """
+    Downloads the file_size bytes of dbfs_path to dst_path and returns the TransferStats.
+    """
+    part_path = os.path.abspath(dst_path) + '.part'
+    journal_path = part_path + '.json'
+    journal = _start_partial_download(part_path, journal_path, file_size)
+    ranges = _get_download_ranges(journal['done'], file_size, streams)
+    if not journal['preallocated'] and (streams <= 1 or len(ranges) <= 1):
+        # Without preallocation the part file holds a prefix, so the only range left is the rest.
+        stats = _download_to_end(dbfs_api, dbfs_path, part_path,
+                                 ranges[0][0] if ranges else file_size, file_size)
+    else:
+        stats = TransferStats()
+        if not journal['preallocated']:
+            with open(part_path, 'r+b') as local_file:
+                local_file.truncate(file_size)
+            journal['preallocated'] = True
+            _save_journal(journal_path, journal)
+        lock = threading.Lock()
+
+        def download_range(download):
+            range_stats = _download_range(dbfs_api, dbfs_path, part_path, *download)
+            with lock:
+                journal['done'].append(list(download))
+                _save_journal(journal_path, journal)
+            return range_stats
+
+        start_time = time.time()
+        for range_stats in parallel_map(download_range, ranges, streams):
+            stats.bytes += range_stats.bytes
+            stats.blocks += range_stats.blocks
+            stats.block_size = range_stats.block_size
+        stats.elapsed = time.time() - start_time
+    replace_file(part_path, dst_path)
+    remove_file(journal_path)
+    return stats
+
+
+def create_download_cache():
+    """
+    Returns the DownloadCache configured with dbfs_cache_dir, or None if it is not set.
+    """
+    conf = get_config()
+    cache_dir = get_client_option(conf, DBFS_CACHE_DIR, os.path.expanduser)
+    if not cache_dir:
+        return None
+    max_bytes = get_client_option(conf, DBFS_CACHE_MAX_BYTES, int, DEFAULT_CACHE_MAX_BYTES)
+    return DownloadCache(cache_dir, max_bytes, conf.host)
+
+
+def get_file(dbfs_path, dst_path, overwrite, streams=1):
+    """
+    Downloads dbfs_path to dst_path and returns the TransferStats of the download.
+
+    The file is downloaded to dst_path.part, next to a journal dst_path.part.json that records
+    the size of the source, and renamed to dst_path once complete. If an earlier download was
+    interrupted and the source still has the same size, only the rest of it is downloaded.
+
+    With streams > 1, the part file is preallocated and disjoint ranges of the file are
+    downloaded with up to streams concurrent requests and written in place. A failed range is
+    retried on its own and complete ranges are recorded in the journal.
+
+    If dbfs_cache_dir is set, the file is served from the DownloadCache when it holds a file
+    of the same DBFS path and size, in which case the TransferStats are empty.
+    """
     if os.path.exists(dst_path) and not overwrite:
         raise LocalFileExistsException('{} exists already.'.format(dst_path))
     dbfs_api = get_dbfs_client()
     file_info = get_status(dbfs_path)
     if file_info.is_dir:
         error_and_quit(('The dbfs file {} is a directory.').format(repr(dbfs_path)))
-    length = file_info.file_size
-    offset = 0
-    with open(dst_path, 'wb') as local_file:
-        while offset < length:
-            response = dbfs_api.read(dbfs_path.absolute_path, offset, BUFFER_SIZE_BYTES)
-            bytes_read = response['bytes_read']
-            data = response['data']
-            offset += bytes_read
-            local_file.write(b64decode(data))
+    cache = create_download_cache()
+    if cache is None:
+        return _download_file(dbfs_api, dbfs_path, file_info.file_size, dst_path, streams)
+    stats = [TransferStats()]
+
+    def download(path):
+        stats[0] = _download_file(dbfs_api, dbfs_path, file_info.file_size, path, streams)
+
+    cache.fetch(dbfs_path, file_info.file_size, dst_path, download)
+    return stats[0]
+
+
+def read_file(dbfs_path):
+    """
+    Returns the contents of dbfs_path. Meant for small files.
+    """
+    dbfs_api = get_dbfs_client()
+    file_size = get_status(dbfs_path).file_size
+    return ''.join(_read_blocks(dbfs_api, dbfs_path, 0, file_size, TransferStats()))
+
+
+def _get_file_size(dbfs_path):
+    file_info = get_status(dbfs_path)
+    if file_info.is_dir:
+        error_and_quit(('The dbfs file {} is a directory.').format(repr(dbfs_path)))
+    return file_info.file_size
+
+
+def iter_file(dbfs_path, offset=0, length=None, read_ahead=READ_AHEAD_BLOCKS):
+    """
+    Yields the contents of dbfs_path block by block in constant memory, starting at offset and
+    up to length bytes or the end of the file. A negative offset counts from the end of the
+    file. Up to read_ahead blocks are read concurrently in the background while the caller
+    consumes the previous ones.
+    """
+    dbfs_api = get_dbfs_client()
+    file_size = _get_file_size(dbfs_path)
+    if offset < 0:
+        offset = max(0, file_size + offset)
+    end = file_size if length is None else min(file_size, offset + length)
+
+    def read_block(start):
+        block_end = min(start + BUFFER_SIZE_BYTES, end)
+        return b''.join(_read_blocks(dbfs_api, dbfs_path, start, block_end, TransferStats()))
+
+    for data in bounded_map(read_block, range(offset, end, BUFFER_SIZE_BYTES), read_ahead):
+        yield data
+
+
+def _first_lines(data, num_lines):
+    end = -1
+    for _ in range(num_lines):
+        end = data.find(b'\n', end + 1)
+        if end < 0:
+            return None
+    return data[:end + 1]
+
+
+def _last_lines(data, num_lines):
+    # A trailing newline ends the last line rather than starting a new one.
+    start = len(data) - 1 if data.endswith(b'\n') else len(data)
+    for _ in range(num_lines):
+        start = data.rfind(b'\n', 0, start)
+        if start < 0:
+            return None
+    return data[start + 1:]
+
+
+def head_file(dbfs_path, num_bytes=None, num_lines=None):
+    """
+    Returns the first num_bytes bytes or, if num_bytes is None, the first num_lines lines of
+    dbfs_path. Only the blocks that contain them are read.
+    """
+    if num_bytes is not None:
+        return b''.join(iter_file(dbfs_path, 0, num_bytes))
+    data = b''
+    for block in iter_file(dbfs_path, read_ahead=1):
+        data += block
+        lines = _first_lines(data, num_lines)
+        if lines is not None:
+            return lines
+    return data
+
+
+def _tail_bytes(dbfs_path, num_bytes):
+    if num_bytes == 0:
+        return b''
+    offset = -num_bytes
+    return b''.join(iter_file(dbfs_path, offset))
+
+
+def tail_file(dbfs_path, num_bytes=None, num_lines=None):
+    """
+    Returns the last num_bytes bytes or, if num_bytes is None, the last num_lines lines of
+    dbfs_path. Lines are found by reading blocks backwards from the end of the file.
+    """
+    if num_bytes is not None:
+        return _tail_bytes(dbfs_path, num_bytes)
+    dbfs_api = get_dbfs_client()
+    end = _get_file_size(dbfs_path)
+    data = b''
+    while end > 0:
+        start = max(0, end - BUFFER_SIZE_BYTES)
+        data = b''.join(_read_blocks(dbfs_api, dbfs_path, start, end, TransferStats())) + data
+        end = start
+        lines = _last_lines(data, num_lines)
+        if lines is not None:
+            return lines
+    return data
+
+
+def hash_file(dbfs_path, file_size):
+    """
+    Returns the SHA-256 hex digest of the first file_size bytes of dbfs_path. The file is
+    streamed through the hash, not stored locally.
+    """
+    dbfs_api = get_dbfs_client()
+    digest = hashlib.sha256()
+    for data in _read_blocks(dbfs_api, dbfs_path, 0, file_size, TransferStats()):
+        digest.update(data)
+    return digest.hexdigest()
 
 
 def delete(dbfs_path, recursive):
@@ -132,6 +759,22 @@ def mkdirs(dbfs_path):
     dbfs_api.mkdirs(dbfs_path.absolute_path)
 
 
+def is_under(dbfs_path, parent):
+    """Returns whether dbfs_path is inside the directory parent."""
+    return dbfs_path.absolute_path.startswith(parent.absolute_path.rstrip('/') + '/')
+
+
+def mkdirs_leaves(dirs, jobs=1):
+    """
+    Creates the DbfsPaths dirs with one mkdirs call per leaf directory, up to jobs at a time.
+    If a file is in the way of a leaf, its directories are created top-down to find the file.
+    Returns the directories that could not be created.
+    """
+    return mkdirs_leaf_directories(
+        dirs, mkdirs, lambda dbfs_path: dbfs_path.absolute_path, jobs,
+        lambda error: get_error_code(error) == DbfsErrorCodes.RESOURCE_ALREADY_EXISTS)
+
+
 def move(dbfs_src, dbfs_dst):
     dbfs_api = get_dbfs_client()
     dbfs_api.move(dbfs_src.absolute_path, dbfs_dst.absolute_path)
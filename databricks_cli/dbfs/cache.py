@@ -0,0 +1,107 @@
+# Databricks CLI
+# Copyright 2017 Databricks, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"), except
+# that the use of services to which certain application programming
+# interfaces (each, an "API") connect requires that the user first obtain
+# a license for the use of the APIs from Databricks, Inc. ("Databricks"),
+# by creating an account at www.databricks.com and agreeing to either (a)
+# the Community Edition Terms of Service, (b) the Databricks Terms of
+# Service, or (c) another written agreement between Licensee and Databricks
+# for the use of the APIs.
+#
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Local read-through cache of DBFS file downloads
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from databricks_cli.files import make_dirs, replace_file, remove_file, stat_files, \
+    evict_least_recently_used
+
+ENTRY_SUFFIX = '.bin'
+DEFAULT_MAX_BYTES = 4 * 2**30
+
+
+class DownloadCache(object):
+    """
+    Cache of downloaded DBFS files under cache_dir, keyed by namespace, DBFS path and file size
+    and holding up to max_bytes.
+
+    Hits are served as hard links to the cached file, or copies where hard links are not
+    supported, so cached files are made read-only to keep them from being changed through a
+    link. The cache can be shared by concurrent processes: files are downloaded to private
+    temporary directories and renamed into place, hits refresh their modification time and the
+    least recently used files are evicted once the cache is over its size.
+    """
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES, namespace=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.namespace = namespace
+
+    def get_entry_path(self, dbfs_path, file_size):
+        key = json.dumps([self.namespace, dbfs_path.absolute_path, file_size])
+        return os.path.join(self.cache_dir, hashlib.sha256(key).hexdigest() + ENTRY_SUFFIX)
+
+    def fetch(self, dbfs_path, file_size, dst_path, download):
+        """
+        Places the file_size bytes long DBFS file dbfs_path at dst_path. On a miss,
+        download(path) is called to download it to path. Returns whether it was a hit.
+        """
+        entry_path = self.get_entry_path(dbfs_path, file_size)
+        if self._serve(entry_path, dst_path):
+            return True
+        if file_size > self.max_bytes:
+            download(dst_path)
+            return False
+        make_dirs(self.cache_dir)
+        tmp_dir = tempfile.mkdtemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            tmp_path = os.path.join(tmp_dir, 'download')
+            download(tmp_path)
+            os.chmod(tmp_path, 0o444)
+            replace_file(tmp_path, entry_path)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        evict_least_recently_used(self.cache_dir, ENTRY_SUFFIX, self.max_bytes, entry_path)
+        if not self._serve(entry_path, dst_path):
+            # Another process evicted the file in the meantime.
+            download(dst_path)
+        return False
+
+    def clear(self):
+        for path, _, _ in stat_files(self.cache_dir, ENTRY_SUFFIX):
+            remove_file(path)
+
+    def _serve(self, entry_path, dst_path):
+        try:
+            os.utime(entry_path, None)
+        except OSError:
+            return False
+        tmp_path = '{}.cache-{}'.format(dst_path, os.getpid())
+        try:
+            try:
+                os.link(entry_path, tmp_path)
+            except (AttributeError, OSError):
+                shutil.copyfile(entry_path, tmp_path)
+        except (IOError, OSError):
+            remove_file(tmp_path)
+            return False
+        replace_file(tmp_path, dst_path)
+        return True
@@ -26,14 +26,19 @@ import click
 from tabulate import tabulate
 from requests.exceptions import HTTPError
 
-from databricks_cli.utils import eat_exceptions, error_and_quit, CONTEXT_SETTINGS
+from databricks_cli.utils import eat_exceptions, error_and_quit, parallel_map, CONTEXT_SETTINGS
 from databricks_cli.version import print_version_callback, version
-from databricks_cli.configure.cli import configure_cli
-from databricks_cli.configure.config import require_config
-from databricks_cli.dbfs.api import put_file, get_file, list_files, \
-    delete, mkdirs, get_status, DbfsErrorCodes, move
+from databricks_cli.configure.cli import configure_cli, api_client_options
+from databricks_cli.configure.config import require_config, set_concurrency, set_client_option, \
+    DBFS_CACHE_DIR
+from databricks_cli.dbfs.api import put_file, put_file_resumable, put_stream, get_file, \
+    iter_file, head_file, tail_file, list_files, delete, mkdirs, mkdirs_leaves, is_under, \
+    get_status, DbfsErrorCodes, move, READ_AHEAD_BLOCKS
 from databricks_cli.dbfs.dbfs_path import DbfsPath, DbfsPathClickType
 from databricks_cli.dbfs.exceptions import LocalFileExistsException
+from databricks_cli.dbfs.manifest import Manifest, hash_local_files, load_manifest, \
+    save_manifest
+from databricks_cli.dbfs.sync import sync, list_dbfs_tree
 
 
 @click.command(context_settings=CONTEXT_SETTINGS)
@@ -87,8 +92,12 @@ def rm_cli(recursive, dbfs_path):
     delete(dbfs_path, recursive)
 
 
-def copy_to_dbfs_non_recursive(src, dbfs_path_dst, overwrite):
-    # Munge dst path in case dbfs_path_dst is a dir
+def copy_to_dbfs_non_recursive(src, dbfs_path_dst, overwrite, resume=False):
+    upload = put_file_resumable if resume else put_file
+    # Munge dst path in case dbfs_path_dst is a dir. A trailing slash always denotes one.
+    if dbfs_path_dst.absolute_path.endswith('/'):
+        upload(src, dbfs_path_dst.join(os.path.basename(src)), overwrite)
+        return
     try:
         if get_status(dbfs_path_dst).is_dir:
             dbfs_path_dst = dbfs_path_dst.join(os.path.basename(src))
@@ -97,74 +106,185 @@ def copy_to_dbfs_non_recursive(src, dbfs_path_dst, overwrite):
             pass
         else:
             raise e
-    put_file(src, dbfs_path_dst, overwrite)
+    upload(src, dbfs_path_dst, overwrite)
 
 
-def copy_from_dbfs_non_recursive(dbfs_path_src, dst, overwrite):
+def copy_from_dbfs_non_recursive(dbfs_path_src, dst, overwrite, streams=1):
     # Munge dst path in case dst is a dir
     if os.path.isdir(dst):
         dst = os.path.join(dst, dbfs_path_src.basename)
-    get_file(dbfs_path_src, dst, overwrite)
+    get_file(dbfs_path_src, dst, overwrite, streams)
 
 
-def copy_to_dbfs_recursive(src, dbfs_path_dst, overwrite):
+def _copy_file_to_dbfs(src, dbfs_path_dst, overwrite):
+    """
+    Returns a message and whether the file was uploaded.
+    """
     try:
-        mkdirs(dbfs_path_dst)
+        put_file(src, dbfs_path_dst, overwrite)
+        return '{} -> {}'.format(src, dbfs_path_dst), True
     except HTTPError as e:
         if e.response.json()['error_code'] == DbfsErrorCodes.RESOURCE_ALREADY_EXISTS:
-            click.echo(e.response.json())
-            return
-    for filename in os.listdir(src):
-        cur_src = os.path.join(src, filename)
-        cur_dbfs_dst = dbfs_path_dst.join(filename)
-        if os.path.isdir(cur_src):
-            copy_to_dbfs_recursive(cur_src, cur_dbfs_dst, overwrite)
-        elif os.path.isfile(cur_src):
-            try:
-                put_file(cur_src, cur_dbfs_dst, overwrite)
-                click.echo('{} -> {}'.format(cur_src, cur_dbfs_dst))
-            except HTTPError as e:
-                if e.response.json()['error_code'] == DbfsErrorCodes.RESOURCE_ALREADY_EXISTS:
-                    click.echo('{} already exists. Skip.'.format(cur_dbfs_dst))
-                else:
-                    raise e
-
-
-def copy_from_dbfs_recursive(dbfs_path_src, dst, overwrite):
+            return '{} already exists. Skip.'.format(dbfs_path_dst), False
+        raise e
+
+
+def _list_uploads(src, dbfs_path_dst):
+    """
+    Returns the DBFS directories of the src tree and the (local path, DBFS path) of its files.
+    """
+    dirs = []
+    uploads = []
+    for dirpath, dirnames, filenames in os.walk(src, followlinks=True):
+        dirnames.sort()
+        cur_dbfs_dst = dbfs_path_dst
+        relpath = os.path.relpath(dirpath, src)
+        if relpath != os.curdir:
+            for name in relpath.split(os.sep):
+                cur_dbfs_dst = cur_dbfs_dst.join(name)
+        dirs.append(cur_dbfs_dst)
+        for filename in sorted(filenames):
+            cur_src = os.path.join(dirpath, filename)
+            if os.path.isfile(cur_src):
+                uploads.append((cur_src, cur_dbfs_dst.join(filename)))
+    return dirs, uploads
+
+
+def _mkdirs_for_uploads(dirs, uploads, jobs):
+    """
+    Creates the DBFS directories dirs and returns the uploads that are not under one that could
+    not be created.
+    """
+    failed = mkdirs_leaves(dirs, jobs)
+    return [upload for upload in uploads if not any(is_under(upload[1], f) for f in failed)]
+
+
+def _skip_unchanged(src, dbfs_path_dst, uploads, jobs):
+    """
+    Returns the (relative path, digest, upload) of the uploads whose files are not known to be
+    unchanged by the Manifest of dbfs_path_dst, and the manifest to update.
+    """
+    relpaths = [os.path.relpath(upload[0], src).replace(os.sep, '/') for upload in uploads]
+    digests = hash_local_files([upload[0] for upload in uploads])
+    old_manifest = load_manifest(dbfs_path_dst)
+    dbfs_tree = list_dbfs_tree(dbfs_path_dst, jobs)
+    changed = []
+    for relpath, digest, upload in zip(relpaths, digests, uploads):
+        size = os.path.getsize(upload[0])
+        file_info = dbfs_tree.get(relpath)
+        if file_info is not None and file_info.file_size == size and \
+                old_manifest.is_unchanged(relpath, size, digest):
+            click.echo('{} is unchanged. Skip.'.format(upload[0]))
+        else:
+            changed.append((relpath, digest, upload))
+    return changed, Manifest(dict(old_manifest.files))
+
+
+def copy_to_dbfs_recursive(src, dbfs_path_dst, overwrite, jobs=1, manifest=False):
+    """
+    Creates the directories of the src tree first, with a mkdirs call per leaf directory, and
+    then uploads its files with up to jobs concurrent uploads. With manifest, files whose
+    contents match the Manifest of dbfs_path_dst are skipped and the manifest is updated
+    afterwards.
+    """
+    dirs, uploads = _list_uploads(src, dbfs_path_dst)
+    uploads = _mkdirs_for_uploads(dirs, uploads, jobs)
+    new_manifest = None
+    entries = [(None, None, upload) for upload in uploads]
+    if manifest:
+        entries, new_manifest = _skip_unchanged(src, dbfs_path_dst, uploads, jobs)
+    results = parallel_map(lambda entry: _copy_file_to_dbfs(entry[2][0], entry[2][1], overwrite),
+                           entries, jobs)
+    for entry, (message, uploaded) in zip(entries, results):
+        click.echo(message)
+        if new_manifest is not None and uploaded:
+            new_manifest.record(entry[0], entry[2][0], entry[1])
+    if new_manifest is not None:
+        save_manifest(dbfs_path_dst, new_manifest)
+
+
+def _copy_file_from_dbfs(dbfs_path_src, dst, overwrite, streams):
+    try:
+        get_file(dbfs_path_src, dst, overwrite, streams)
+        return '{} -> {}'.format(dbfs_path_src, dst)
+    except LocalFileExistsException:
+        return ('{} already exists locally as {}. Skip. To overwrite, you' +
+                'should provide the --overwrite flag.').format(dbfs_path_src, dst)
+
+
+def copy_from_dbfs_recursive(dbfs_path_src, dst, overwrite, streams=1, jobs=1):
+    """
+    Lists dbfs_path_src with up to jobs concurrent list calls, creates the local directories and
+    then downloads up to jobs files at once. Messages are echoed in path order.
+    """
     if os.path.isfile(dst):
         click.echo('{} exists as a file. Skipping this subtree {}'.format(dst, repr(dbfs_path_src)))
         return
     elif not os.path.isdir(dst):
         os.makedirs(dst)
 
-    for dbfs_src_file_info in list_files(dbfs_path_src):
-        cur_dbfs_src = dbfs_src_file_info.dbfs_path
-        cur_dst = os.path.join(dst, cur_dbfs_src.basename)
-        if dbfs_src_file_info.is_dir:
-            copy_from_dbfs_recursive(cur_dbfs_src, cur_dst, overwrite)
-        else:
-            try:
-                get_file(cur_dbfs_src, cur_dst, overwrite)
-                click.echo('{} -> {}'.format(cur_dbfs_src, cur_dst))
-            except LocalFileExistsException:
-                click.echo(('{} already exists locally as {}. Skip. To overwrite, you' +
-                            'should provide the --overwrite flag.').format(cur_dbfs_src, cur_dst))
+    tree = list_dbfs_tree(dbfs_path_src, jobs)
+    skipped = []
+    downloads = []
+    for relpath in sorted(tree, key=lambda p: p.split('/')):
+        if any(relpath.startswith(parent + '/') for parent in skipped):
+            continue
+        file_info = tree[relpath]
+        cur_dst = os.path.join(dst, *relpath.split('/'))
+        if not file_info.is_dir:
+            downloads.append((file_info.dbfs_path, cur_dst))
+        elif os.path.isfile(cur_dst):
+            click.echo('{} exists as a file. Skipping this subtree {}'
+                       .format(cur_dst, repr(file_info.dbfs_path)))
+            skipped.append(relpath)
+        elif not os.path.isdir(cur_dst):
+            os.makedirs(cur_dst)
+
+    for message in parallel_map(lambda d: _copy_file_from_dbfs(d[0], d[1], overwrite, streams),
+                                downloads, jobs):
+        click.echo(message)
+
+
+def _copy_stdin_to_dbfs(dst, overwrite, recursive, resume):
+    if recursive or resume:
+        error_and_quit('--recursive and --resume cannot be used to copy standard input.')
+    if dst.endswith('/'):
+        error_and_quit('The destination of standard input must be a file, not {}.'
+                       .format(repr(DbfsPath(dst))))
+    put_stream(click.get_binary_stream('stdin'), DbfsPath(dst), overwrite)
 
 
 @click.command(context_settings=CONTEXT_SETTINGS)
 @click.option('--recursive', '-r', is_flag=True, default=False)
 @click.option('--overwrite', is_flag=True, default=False)
-@click.argument('src')
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of files to copy and directories to list concurrently in recursive '
+                   'copies.')
+@click.option('--streams', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of concurrent requests used to download each file from DBFS.')
+@click.option('--resume', is_flag=True, default=False,
+              help='Make the upload of a single file resumable. Rerun the same command to '
+                   'continue an interrupted upload.')
+@click.option('--manifest', is_flag=True, default=False,
+              help='In recursive copies to DBFS, skip the files whose contents match the '
+                   'manifest stored in the destination directory and update it.')
+@click.option('--cache-dir', type=click.Path(file_okay=False),
+              help='Serve downloads from DBFS from a local cache in this directory and add the '
+                   'files that are not cached yet. Overrides dbfs_cache_dir.')
+@click.argument('src') #  NOQA
 @click.argument('dst')
 @require_config
 @eat_exceptions
-def cp_cli(recursive, overwrite, src, dst):
+def cp_cli(recursive, overwrite, jobs, streams, resume, manifest, cache_dir, src, dst):
     """
     Copy files to and from DBFS.
 
     Note that this function will fail if the src and dst are both on the local filesystem
     or if they are both DBFS paths.
 
+    If src is -, standard input is streamed to the DBFS file dst, e.g.
+    ``pg_dump db | gzip | dbfs cp - dbfs:/backups/db.gz``.
+
     For non-recursive copies, if the dst is a directory, the file will be placed inside the
     directory. For example ``dbfs cp dbfs:/apple.txt .`` will create a file at `./apple.txt`.
 
@@ -173,30 +293,56 @@ def cp_cli(recursive, overwrite, src, dst):
     ``dbfs cp -r dbfs:/foo foo`` will create a directory foo and place the files ``dbfs:/foo/a`` at
     ``foo/a``. If ``foo/a`` already exists, the file will not be overriden unless the --overwrite
     flag is provided -- however, dbfs cp --recursive will continue to try and copy other files.
+
+    Recursive copies to DBFS upload up to --jobs files at once. Directories are always created
+    before the files they contain, with one call per leaf directory. Recursive copies from DBFS
+    list up to --jobs directories and download up to --jobs files at once.
+
+    With --streams, files are downloaded from DBFS in ranges fetched concurrently and written
+    in place, which speeds up the download of large files.
+
+    Files are downloaded from DBFS to a .part file that is renamed once complete. If a download
+    is interrupted, running the same command again continues it unless the size of the DBFS file
+    changed.
+
+    With --resume, a single file is uploaded to a staging path and moved into place once
+    complete. If the upload is interrupted, running the same command again continues it from
+    the last block the server confirmed.
+
+    With --manifest, recursive copies to DBFS hash the local files and skip those whose size
+    and SHA-256 digest match the manifest file .dbfs-manifest.json in the destination
+    directory. The manifest is updated with the files that were uploaded.
+
+    With --cache-dir, downloads from DBFS are served from a local cache when it holds a file of
+    the same DBFS path and size, as read-only hard links where possible. The least recently used
+    files are evicted once the cache is over dbfs_cache_max_bytes.
     """
+    set_concurrency(jobs * streams)
+    if cache_dir:
+        set_client_option(DBFS_CACHE_DIR, cache_dir)
+    # Copy standard input to DBFS in this case
+    if src == '-' and DbfsPath.is_valid(dst):
+        _copy_stdin_to_dbfs(dst, overwrite, recursive, resume)
     # Copy to DBFS in this case
-    if not DbfsPath.is_valid(src) and DbfsPath.is_valid(dst):
+    elif not DbfsPath.is_valid(src) and DbfsPath.is_valid(dst):
         if not os.path.exists(src):
             error_and_quit('The local file {} does not exist.'.format(src))
-        if not recursive:
-            if os.path.isdir(src):
-                error_and_quit(('The local file {} is a directory. You must provide --recursive')
-                               .format(src))
-            copy_to_dbfs_non_recursive(src, DbfsPath(dst), overwrite)
+        if not os.path.isdir(src):
+            copy_to_dbfs_non_recursive(src, DbfsPath(dst), overwrite, resume)
+        elif recursive:
+            copy_to_dbfs_recursive(src, DbfsPath(dst), overwrite, jobs, manifest)
         else:
-            if not os.path.isdir(src):
-                copy_to_dbfs_non_recursive(src, DbfsPath(dst), overwrite)
-                return
-            copy_to_dbfs_recursive(src, DbfsPath(dst), overwrite)
+            error_and_quit(('The local file {} is a directory. You must provide --recursive')
+                           .format(src))
     # Copy from DBFS in this case
     elif DbfsPath.is_valid(src) and not DbfsPath.is_valid(dst):
         if not recursive:
-            copy_from_dbfs_non_recursive(DbfsPath(src), dst, overwrite)
+            copy_from_dbfs_non_recursive(DbfsPath(src), dst, overwrite, streams)
         else:
             dbfs_path_src = DbfsPath(src)
             if not get_status(dbfs_path_src).is_dir:
-                copy_from_dbfs_non_recursive(dbfs_path_src, dst, overwrite)
-            copy_from_dbfs_recursive(dbfs_path_src, dst, overwrite)
+                copy_from_dbfs_non_recursive(dbfs_path_src, dst, overwrite, streams)
+            copy_from_dbfs_recursive(dbfs_path_src, dst, overwrite, streams, jobs)
     elif not DbfsPath.is_valid(src) and not DbfsPath.is_valid(dst):
         error_and_quit('Both paths provided are from your local filesystem. '
                        'To use this utility, one of the src or dst must be prefixed '
@@ -209,6 +355,37 @@ def cp_cli(recursive, overwrite, src, dst):
         assert False, 'not reached'
 
 
+@click.command(context_settings=CONTEXT_SETTINGS)
+@click.option('--delete', 'delete_extra', is_flag=True, default=False,
+              help='Delete DBFS files and directories that do not exist in SRC.')
+@click.option('--checksum', is_flag=True, default=False,
+              help='Compare files of the same size by their contents. This downloads them.')
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of files to upload concurrently.')
+@click.option('--manifest', is_flag=True, default=False,
+              help='Compare files of the same size with the digests in the manifest stored in '
+                   'DST and update it.')
+@click.argument('src', type=click.Path(exists=True, file_okay=False))
+@click.argument('dst', type=DbfsPathClickType())
+@require_config
+@eat_exceptions #  NOQA
+def sync_cli(delete_extra, checksum, jobs, manifest, src, dst):
+    """
+    Make a DBFS directory mirror a local one.
+
+    Only the files of SRC that do not exist in DST or whose size differs are uploaded. With
+    --checksum, files of the same size are also uploaded if their contents differ. With --delete,
+    files and directories of DST that do not exist in SRC are deleted, as are those that are a
+    file on one side and a directory on the other.
+
+    With --manifest, files of the same size are compared by their SHA-256 digest with the
+    manifest file .dbfs-manifest.json in DST, so that same-size edits are detected without
+    downloading anything. The manifest is updated afterwards.
+    """
+    set_concurrency(jobs)
+    sync(src, dst, delete_extra, checksum, jobs, click.echo, manifest)
+
+
 @click.command(context_settings=CONTEXT_SETTINGS)
 @click.argument('src', type=DbfsPathClickType())
 @click.argument('dst', type=DbfsPathClickType())
@@ -221,9 +398,85 @@ def mv_cli(src, dst):
     move(src, dst)
 
 
+def _write_stdout(blocks):
+    stdout = click.get_binary_stream('stdout')
+    for data in blocks:
+        stdout.write(data)
+    stdout.flush()
+
+
+@click.command(context_settings=CONTEXT_SETTINGS)
+@click.option('--offset', type=int, default=0, show_default=True,
+              help='Byte offset to start at. A negative offset counts from the end of the file.')
+@click.option('--length', type=click.IntRange(min=0),
+              help='Number of bytes to write. Defaults to the rest of the file.')
+@click.argument('src', type=DbfsPathClickType())
+@require_config
+@eat_exceptions
+def cat_cli(offset, length, src):
+    """
+    Writes the contents of a DBFS file to standard output.
+
+    The file is streamed while the next few blocks are read ahead concurrently, e.g.
+    ``dbfs cat dbfs:/logs/x.json | jq .``. With --offset and --length, only that byte range is
+    read.
+    """
+    set_concurrency(READ_AHEAD_BLOCKS)
+    _write_stdout(iter_file(src, offset, length))
+
+
+def _head_or_tail_options(function):
+    options = [
+        click.option('--lines', '-n', 'num_lines', type=click.IntRange(min=0), default=10,
+                     show_default=True, help='Number of lines to write.'),
+        click.option('--bytes', '-c', 'num_bytes', type=click.IntRange(min=0),
+                     help='Number of bytes to write instead of lines.'),
+    ]
+    for option in reversed(options):
+        function = option(function)
+    return function
+
+
+@click.command(context_settings=CONTEXT_SETTINGS)
+@_head_or_tail_options
+@click.argument('src', type=DbfsPathClickType())
+@require_config
+@eat_exceptions
+def head_cli(num_lines, num_bytes, src):
+    """
+    Writes the first lines or bytes of a DBFS file to standard output.
+
+    Only the beginning of the file is read, e.g. ``dbfs head -n 5 dbfs:/data/x.csv``.
+    """
+    if num_bytes is not None:
+        set_concurrency(READ_AHEAD_BLOCKS)
+        _write_stdout(iter_file(src, 0, num_bytes))
+    else:
+        _write_stdout([head_file(src, num_lines=num_lines)])
+
+
+@click.command(context_settings=CONTEXT_SETTINGS)
+@_head_or_tail_options
+@click.argument('src', type=DbfsPathClickType())
+@require_config
+@eat_exceptions
+def tail_cli(num_lines, num_bytes, src):
+    """
+    Writes the last lines or bytes of a DBFS file to standard output.
+
+    Only the end of the file is read, e.g. ``dbfs tail -n 100 dbfs:/logs/driver.log``.
+    """
+    if num_bytes is not None:
+        set_concurrency(READ_AHEAD_BLOCKS)
+        _write_stdout(iter_file(src, -num_bytes) if num_bytes > 0 else [])
+    else:
+        _write_stdout([tail_file(src, num_lines=num_lines)])
+
+
 @click.group(context_settings=CONTEXT_SETTINGS, short_help='Utility to interact with DBFS.')
 @click.option('--version', '-v', is_flag=True, callback=print_version_callback,
               expose_value=False, is_eager=True, help=version)
+@api_client_options
 def dbfs_group():
     """
     Utility to interact with DBFS.
@@ -239,3 +492,7 @@ dbfs_group.add_command(mkdirs_cli, name='mkdirs')
 dbfs_group.add_command(rm_cli, name='rm')
 dbfs_group.add_command(cp_cli, name='cp')
 dbfs_group.add_command(mv_cli, name='mv')
+dbfs_group.add_command(sync_cli, name='sync')
+dbfs_group.add_command(cat_cli, name='cat')
+dbfs_group.add_command(head_cli, name='head')
+dbfs_group.add_command(tail_cli, name='tail')
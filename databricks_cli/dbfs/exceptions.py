@@ -24,3 +24,7 @@
 
 class LocalFileExistsException(Exception):
     pass
+
+
+class DbfsFileExistsException(Exception):
+    pass
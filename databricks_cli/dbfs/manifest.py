@@ -0,0 +1,125 @@
+# Databricks CLI
+# Copyright 2017 Databricks, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"), except
+# that the use of services to which certain application programming
+# interfaces (each, an "API") connect requires that the user first obtain
+# a license for the use of the APIs from Databricks, Inc. ("Databricks"),
+# by creating an account at www.databricks.com and agreeing to either (a)
+# the Community Edition Terms of Service, (b) the Databricks Terms of
+# Service, or (c) another written agreement between Licensee and Databricks
+# for the use of the APIs.
+#
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+
+from requests.exceptions import HTTPError
+
+from databricks_cli.utils import parallel_map
+from databricks_cli.dbfs.api import put_file, read_file, get_error_code, DbfsErrorCodes
+
+# Name of the manifest file in the root of a destination directory.
+MANIFEST_NAME = '.dbfs-manifest.json'
+MANIFEST_VERSION = 1
+HASH_BLOCK_SIZE_BYTES = 2**20
+
+
+def hash_local_file(path):
+    """
+    Returns the SHA-256 hex digest of the local file at path.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as local_file:
+        while True:
+            data = local_file.read(HASH_BLOCK_SIZE_BYTES)
+            if len(data) == 0:
+                return digest.hexdigest()
+            digest.update(data)
+
+
+def hash_local_files(paths, jobs=None):
+    """
+    Returns the SHA-256 hex digests of the local files at paths, hashing up to jobs files at
+    once. hashlib releases the GIL while it hashes, so threads use every core. jobs defaults to
+    the number of cores.
+    """
+    return list(parallel_map(hash_local_file, paths, jobs or multiprocessing.cpu_count()))
+
+
+class Manifest(object):
+    """
+    Size, modification time and SHA-256 digest of the files last uploaded to a DBFS directory,
+    keyed by their path relative to it with / separators. It is stored as MANIFEST_NAME in the
+    directory, so that later uploads can skip the files whose contents are already there after
+    hashing them locally.
+
+    The manifest is trusted as long as the DBFS file still has the recorded size. Files changed
+    in DBFS by other means without changing their size are not detected.
+    """
+    def __init__(self, files=None):
+        self.files = files or {}
+
+    def is_unchanged(self, relpath, size, digest):
+        entry = self.files.get(relpath)
+        return entry is not None and entry['size'] == size and entry['sha256'] == digest
+
+    def record(self, relpath, path, digest):
+        stat = os.stat(path)
+        self.files[relpath] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': digest}
+
+    def remove(self, relpath):
+        """Removes relpath and, if it is a directory, every file under it."""
+        for path in list(self.files):
+            if path == relpath or path.startswith(relpath + '/'):
+                del self.files[path]
+
+    def to_json(self):
+        return json.dumps({'version': MANIFEST_VERSION, 'files': self.files}, indent=1,
+                          sort_keys=True)
+
+    @classmethod
+    def from_json(cls, contents):
+        manifest = json.loads(contents)
+        if manifest.get('version') != MANIFEST_VERSION:
+            return cls()
+        return cls(manifest['files'])
+
+
+def load_manifest(dbfs_path):
+    """
+    Returns the Manifest of the DBFS directory dbfs_path, which is empty if it has none or it
+    cannot be read.
+    """
+    try:
+        return Manifest.from_json(read_file(dbfs_path.join(MANIFEST_NAME)))
+    except HTTPError as e:
+        if get_error_code(e) == DbfsErrorCodes.RESOURCE_DOES_NOT_EXIST:
+            return Manifest()
+        raise e
+    except (ValueError, KeyError, AttributeError):
+        return Manifest()
+
+
+def save_manifest(dbfs_path, manifest):
+    handle, path = tempfile.mkstemp(suffix='.json')
+    try:
+        with os.fdopen(handle, 'w') as f:
+            f.write(manifest.to_json())
+        put_file(path, dbfs_path.join(MANIFEST_NAME), True)
+    finally:
+        os.remove(path)
@@ -0,0 +1,242 @@
+# Databricks CLI
+# Copyright 2017 Databricks, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"), except
+# that the use of services to which certain application programming
+# interfaces (each, an "API") connect requires that the user first obtain
+# a license for the use of the APIs from Databricks, Inc. ("Databricks"),
+# by creating an account at www.databricks.com and agreeing to either (a)
+# the Community Edition Terms of Service, (b) the Databricks Terms of
+# Service, or (c) another written agreement between Licensee and Databricks
+# for the use of the APIs.
+#
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+from requests.exceptions import HTTPError
+
+from databricks_cli.utils import parallel_map
+from databricks_cli.dbfs.api import list_files, put_file, hash_file, delete, mkdirs_leaves, \
+    get_error_code, DbfsErrorCodes
+from databricks_cli.dbfs.manifest import MANIFEST_NAME, Manifest, hash_local_file, \
+    hash_local_files, load_manifest, save_manifest
+
+
+def list_local_tree(src):
+    """
+    Lists the local directory src recursively. Returns a dict from the path of every file and
+    directory relative to src, with / separators, to its size, or None for directories.
+    """
+    tree = {}
+    for dirpath, dirnames, filenames in os.walk(src, followlinks=True):
+        relpath = os.path.relpath(dirpath, src)
+        prefix = '' if relpath == os.curdir else relpath.replace(os.sep, '/') + '/'
+        for dirname in dirnames:
+            tree[prefix + dirname] = None
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            if os.path.isfile(path):
+                tree[prefix + filename] = os.path.getsize(path)
+    return tree
+
+
+def _relpath(dbfs_path, parent):
+    """
+    Returns the path of dbfs_path relative to its ancestor parent, with / separators on every OS.
+    """
+    return dbfs_path.absolute_path[len(parent.absolute_path.rstrip('/') + '/'):]
+
+
+def list_dbfs_tree(dbfs_path, jobs=1):
+    """
+    Lists dbfs_path recursively, one level at a time with up to jobs concurrent list calls.
+    Returns a dict from the path of every file and directory relative to dbfs_path, with /
+    separators, to its FileInfo. Returns an empty dict if dbfs_path does not exist.
+    """
+    tree = {}
+    level = [dbfs_path]
+    while level:
+        try:
+            listings = list(parallel_map(list_files, level, jobs))
+        except HTTPError as e:
+            if level[0] == dbfs_path and \
+                    get_error_code(e) == DbfsErrorCodes.RESOURCE_DOES_NOT_EXIST:
+                return tree
+            raise e
+        level = []
+        for files in listings:
+            for file_info in files:
+                tree[_relpath(file_info.dbfs_path, dbfs_path)] = file_info
+                if file_info.is_dir:
+                    level.append(file_info.dbfs_path)
+    return tree
+
+
+class SyncPlan(object):
+    """
+    Changes that make a DBFS directory mirror a local one.
+
+    deletes are the DBFS paths to delete recursively, mkdirs the relative paths of the
+    directories to create, uploads the relative paths of the files that are new or have a
+    different size and candidates those of the same size, which are uploaded only if their
+    contents differ. conflicts are relative paths that are a file on one side and a directory on
+    the other and are left alone because deletes were not allowed.
+    """
+    def __init__(self):
+        self.deletes = []
+        self.mkdirs = []
+        self.uploads = []
+        self.candidates = []
+        self.conflicts = []
+
+
+def _is_under(relpath, parents):
+    return any(relpath == parent or relpath.startswith(parent + '/') for parent in parents)
+
+
+def plan_sync(local_tree, dbfs_tree, delete_extra):
+    """
+    Compares the trees returned by list_local_tree and list_dbfs_tree. DBFS files and
+    directories that do not exist locally are deleted if delete_extra is set, as are those
+    whose type differs from the local one.
+    """
+    plan = SyncPlan()
+    deleted = []
+    for relpath in sorted(dbfs_tree):
+        if _is_under(relpath, deleted) or _is_under(relpath, plan.conflicts):
+            continue
+        file_info = dbfs_tree[relpath]
+        if relpath in local_tree and file_info.is_dir == (local_tree[relpath] is None):
+            continue
+        if delete_extra:
+            plan.deletes.append(file_info.dbfs_path)
+            deleted.append(relpath)
+        elif relpath in local_tree:
+            plan.conflicts.append(relpath)
+    for relpath in sorted(local_tree):
+        if _is_under(relpath, plan.conflicts):
+            continue
+        file_info = None if _is_under(relpath, deleted) else dbfs_tree.get(relpath)
+        size = local_tree[relpath]
+        if size is None:
+            if file_info is None:
+                plan.mkdirs.append(relpath)
+        elif file_info is None or file_info.file_size != size:
+            plan.uploads.append(relpath)
+        else:
+            plan.candidates.append(relpath)
+    return plan
+
+
+def _join(dbfs_path, relpath):
+    for name in relpath.split('/'):
+        dbfs_path = dbfs_path.join(name)
+    return dbfs_path
+
+
+def _sync_file(src_path, dst_path, compare, digest=None):
+    """
+    Uploads src_path to dst_path unless compare is set and the DBFS file has the same SHA-256
+    digest, which is digest if it is already known. Returns whether the file was uploaded.
+    """
+    if compare:
+        digest = digest or hash_local_file(src_path)
+        if digest == hash_file(dst_path, os.path.getsize(src_path)):
+            return False
+    put_file(src_path, dst_path, True)
+    return True
+
+
+def _local_path(src, relpath):
+    return os.path.join(src, *relpath.split('/'))
+
+
+def _apply_deletes_and_mkdirs(plan, dbfs_path, create_root, jobs, echo):
+    for relpath in plan.conflicts:
+        echo('{} is a file on one side and a directory on the other. Skip. To replace it, '
+             'you should provide the --delete flag.'.format(_join(dbfs_path, relpath)))
+    for dbfs_path_extra in plan.deletes:
+        delete(dbfs_path_extra, True)
+        echo('Deleted {}'.format(dbfs_path_extra))
+    dirs = [_join(dbfs_path, relpath) for relpath in plan.mkdirs]
+    if create_root:
+        dirs.append(dbfs_path)
+    if dirs:
+        mkdirs_leaves(dirs, jobs)
+
+
+def _compare_with_manifest(src, dbfs_path, plan, local_tree, checksum):
+    """
+    Compares the candidates of plan with the digests in the Manifest of dbfs_path. Returns the
+    files to sync as (relative path, compare, digest) and a copy of the manifest that records the
+    unchanged candidates.
+    """
+    old_manifest = load_manifest(dbfs_path)
+    new_manifest = Manifest(dict(old_manifest.files))
+    paths = plan.uploads + plan.candidates
+    digests = dict(zip(paths, hash_local_files([_local_path(src, p) for p in paths])))
+    uploads = list(plan.uploads)
+    compares = []
+    for relpath in plan.candidates:
+        if old_manifest.is_unchanged(relpath, local_tree[relpath], digests[relpath]):
+            new_manifest.record(relpath, _local_path(src, relpath), digests[relpath])
+        elif relpath in old_manifest.files:
+            uploads.append(relpath)
+        elif checksum:
+            compares.append(relpath)
+    files = [(relpath, False, digests[relpath]) for relpath in sorted(uploads)] + \
+        [(relpath, True, digests[relpath]) for relpath in compares]
+    return files, new_manifest
+
+
+def _save_synced_manifest(manifest, src, dbfs_path, files, deletes):
+    for relpath, _, digest in files:
+        manifest.record(relpath, _local_path(src, relpath), digest)
+    for dbfs_path_extra in deletes:
+        manifest.remove(_relpath(dbfs_path_extra, dbfs_path))
+    save_manifest(dbfs_path, manifest)
+
+
+def sync(src, dbfs_path, delete_extra=False, checksum=False, jobs=1, echo=None, #  NOQA
+         manifest=False):
+    """
+    Makes dbfs_path mirror the local directory src, uploading only the files that are new or
+    whose size differs, with up to jobs concurrent uploads. With checksum, files of the same
+    size are compared by their SHA-256 digest, which downloads them. With delete_extra, DBFS
+    files that do not exist in src are deleted. echo is called with a message for every change.
+
+    With manifest, files of the same size are first compared with the digests in the Manifest of
+    dbfs_path, which is updated afterwards. Only the files it does not know are downloaded when
+    checksum is set as well. Returns the SyncPlan that was carried out.
+    """
+    echo = echo or (lambda message: None)
+    dbfs_tree = list_dbfs_tree(dbfs_path, jobs)
+    dbfs_tree.pop(MANIFEST_NAME, None)
+    local_tree = list_local_tree(src)
+    plan = plan_sync(local_tree, dbfs_tree, delete_extra)
+    _apply_deletes_and_mkdirs(plan, dbfs_path, not dbfs_tree, jobs, echo)
+    new_manifest = None
+    if manifest:
+        files, new_manifest = _compare_with_manifest(src, dbfs_path, plan, local_tree, checksum)
+    else:
+        compares = plan.candidates if checksum else []
+        files = [(relpath, False, None) for relpath in plan.uploads] + \
+            [(relpath, True, None) for relpath in compares]
+    results = parallel_map(lambda f: _sync_file(_local_path(src, f[0]), _join(dbfs_path, f[0]),
+                                                f[1], f[2]), files, jobs)
+    for f, uploaded in zip(files, results):
+        if uploaded:
+            echo('{} -> {}'.format(_local_path(src, f[0]), _join(dbfs_path, f[0])))
+    if new_manifest is not None:
+        _save_synced_manifest(new_manifest, src, dbfs_path, files, plan.deletes)
+    return plan
@@ -0,0 +1,99 @@
+# Databricks CLI
+# Copyright 2017 Databricks, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"), except
+# that the use of services to which certain application programming
+# interfaces (each, an "API") connect requires that the user first obtain
+# a license for the use of the APIs from Databricks, Inc. ("Databricks"),
+# by creating an account at www.databricks.com and agreeing to either (a)
+# the Community Edition Terms of Service, (b) the Databricks Terms of
+# Service, or (c) another written agreement between Licensee and Databricks
+# for the use of the APIs.
+#
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Helpers for the local files of the CLI, such as journals and caches shared by concurrent processes
+"""
+
+import errno
+import os
+
+
+def make_dirs(path):
+    """
+    Creates the directory path, readable by its owner only, unless it exists already.
+    """
+    try:
+        os.makedirs(path, 0o700)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+
+def replace_file(src_path, dst_path):
+    """
+    Renames src_path to dst_path, replacing dst_path if it exists.
+    """
+    try:
+        os.rename(src_path, dst_path)
+    except OSError:
+        # Windows does not rename over an existing file.
+        remove_file(dst_path)
+        os.rename(src_path, dst_path)
+
+
+def remove_file(path):
+    """
+    Removes path unless it does not exist.
+    """
+    try:
+        os.remove(path)
+    except OSError as e:
+        if e.errno != errno.ENOENT:
+            raise
+
+
+def stat_files(directory, suffix):
+    """
+    Returns the (path, modification time, size) of the files in directory whose names end with
+    suffix. Files removed while listing are left out.
+    """
+    if not os.path.isdir(directory):
+        return []
+    entries = []
+    for filename in os.listdir(directory):
+        if not filename.endswith(suffix):
+            continue
+        path = os.path.join(directory, filename)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((path, stat.st_mtime, stat.st_size))
+    return entries
+
+
+def evict_least_recently_used(directory, suffix, max_bytes, keep_path=None):
+    """
+    Removes the least recently modified files in directory whose names end with suffix until
+    they take up at most max_bytes. keep_path is never removed.
+    """
+    entries = stat_files(directory, suffix)
+    total_bytes = sum(size for _, _, size in entries)
+    for path, _, size in sorted(entries, key=lambda entry: entry[1]):
+        if total_bytes <= max_bytes:
+            break
+        if path != keep_path:
+            remove_file(path)
+            total_bytes -= size
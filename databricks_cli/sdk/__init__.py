@@ -52,4 +52,8 @@ To get started, below is an example usage of the Python API client.
   help(JobsService)
 """
 from .service import *
-from .api_client import ApiClient
+from .api_client import ApiClient, AsyncApiClient, BatchResult, CallRecorder
+from .retry import RetryPolicy
+from .rate_limiter import RateLimiter
+from .cache import ResponseCache
+from .hooks import RequestHook, RequestStats
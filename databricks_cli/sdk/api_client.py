@@ -29,41 +29,123 @@ A common class to be used by client of different APIs
 """
 
 import base64
+import hashlib
 import json
+import socket
+import threading
+import time
 import warnings
+import zlib
 import requests
 import ssl
 
 import version
 
-from requests.adapters import HTTPAdapter
+from collections import namedtuple
+from multiprocessing.pool import ThreadPool
+from requests.adapters import HTTPAdapter, DEFAULT_POOLSIZE, DEFAULT_POOLBLOCK
 
 try:
     from requests.packages.urllib3.poolmanager import PoolManager
+    from requests.packages.urllib3.connection import HTTPConnection
     from requests.packages.urllib3 import exceptions
 except ImportError:
     from urllib3.poolmanager import PoolManager
+    from urllib3.connection import HTTPConnection
     from urllib3 import exceptions
 
 from databricks_cli.version import version as databricks_cli_version
+from databricks_cli.sdk.retry import RetryPolicy
+from databricks_cli.sdk.hooks import RequestStats
+
+
+def _matches(path, prefixes):
+    return any(path.startswith(prefix) for prefix in prefixes)
+
+
+def gzip_compress(data):
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+# Outcome of one call of ApiClient.perform_batch: either the response or the exception raised.
+BatchResult = namedtuple('BatchResult', ['response', 'error'])
+
 
 class TlsV1HttpAdapter(HTTPAdapter):
     """
     A HTTP adapter implementation that specifies the ssl version to be TLS1.
     This avoids problems with openssl versions that
     use SSL3 as a default (which is not supported by the server side).
+
+    Pooled connections are kept alive with TCP keep-alive probes. If idle_timeout is set and no
+    request went through the adapter for that many seconds, the pool is emptied before the next
+    request so that it does not pick up connections the server or a proxy has already dropped.
     """
 
-    def init_poolmanager(self, connections, maxsize, block=False):
-        self.poolmanager = PoolManager(num_pools=connections, maxsize=maxsize, block=block, ssl_version=ssl.PROTOCOL_TLSv1_2)
+    def __init__(self, idle_timeout=None, **kwargs):
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._active_requests = 0
+        self._last_used = time.time()
+        super(TlsV1HttpAdapter, self).__init__(**kwargs)
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        socket_options = HTTPConnection.default_socket_options + \
+            [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+        self.poolmanager = PoolManager(num_pools=connections, maxsize=maxsize, block=block,
+            ssl_version=ssl.PROTOCOL_TLSv1_2, socket_options=socket_options, **pool_kwargs)
+
+    def send(self, request, **kwargs):
+        with self._lock:
+            if self.idle_timeout is not None and self._active_requests == 0 and \
+                    time.time() - self._last_used > self.idle_timeout:
+                self.poolmanager.clear()
+            self._active_requests += 1
+        try:
+            return super(TlsV1HttpAdapter, self).send(request, **kwargs)
+        finally:
+            with self._lock:
+                self._active_requests -= 1
+                self._last_used = time.time()
 
 class ApiClient(object):
     """
     A partial Python implementation of dbc rest api
     to be used by different versions of the client.
+
+    pool_maxsize is the number of connections kept alive per host and should be at least the
+    number of threads sharing the client. With pool_block set, threads wait for a free connection
+    instead of opening throwaway ones once the pool is exhausted. pool_idle_timeout is the number
+    of seconds after which idle pooled connections are discarded.
+
+    Throttled and transiently failing calls are retried according to retry_policy, which defaults
+    to RetryPolicy(). Pass RetryPolicy(max_attempts=1) to disable retries.
+
+    If a rate_limiter is given, every attempt waits for it so that all threads sharing the client
+    together stay under the rate limits of the workspace.
+
+    Compressed responses are requested and decoded transparently except for the endpoints that
+    start with one of uncompressed_response_paths. Request bodies of at least compress_min_bytes
+    sent to endpoints that start with one of compress_request_paths are gzipped.
+
+    If a ResponseCache is given as cache, responses of the GET endpoints it has a TTL for are
+    served from it while they are fresh.
+
+    The data of a query is serialized to JSON unless it is a bytearray or memoryview, which is
+    sent as the already serialized body.
+
+    hooks are RequestHook instances notified of every request, response, error and retry. The
+    client always keeps per endpoint counters in stats, a RequestStats hook.
     """
     def __init__(self, user = None, password = None, host = None, token = None, configUrl = None,
-            apiVersion = version.API_VERSION, default_headers = {}, verify = True):
+            apiVersion = version.API_VERSION, default_headers = {}, verify = True,
+            pool_maxsize = DEFAULT_POOLSIZE, pool_block = DEFAULT_POOLBLOCK,
+            pool_idle_timeout = None, retry_policy = None, rate_limiter = None,
+            compress_request_paths = (), compress_min_bytes = 1024,
+            uncompressed_response_paths = (), cache = None, hooks = None):
         if configUrl:
             self.url = configUrl
             params = self.performQuery("/", headers = {})[1]
@@ -76,7 +158,11 @@ class ApiClient(object):
             host = host[:-1]
 
         self.session = requests.Session()
-        self.session.mount('https://', TlsV1HttpAdapter())
+        self.pool_maxsize = pool_maxsize
+        adapter = TlsV1HttpAdapter(idle_timeout=pool_idle_timeout, pool_maxsize=pool_maxsize,
+            pool_block=pool_block)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
 
         self.url = "%s/api/%s" % (host, apiVersion)
         if user is not None and password is not None:
@@ -89,25 +175,161 @@ class ApiClient(object):
         user_agent = {'user-agent': 'databricks-cli-{v}'.format(v=databricks_cli_version)}
         self.default_headers = dict(auth.items() + default_headers.items() + user_agent.items())
         self.verify = verify
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.rate_limiter = rate_limiter
+        self.compress_request_paths = tuple(compress_request_paths)
+        self.compress_min_bytes = compress_min_bytes
+        self.uncompressed_response_paths = tuple(uncompressed_response_paths)
+        self.cache = cache
+        self.stats = RequestStats()
+        self.hooks = [self.stats] + list(hooks or [])
+        # Cached responses are only shared between clients of the same workspace and user.
+        self._cache_namespace = [self.url,
+            hashlib.sha256(self.default_headers.get('Authorization', '')).hexdigest()]
 
     def close(self):
-        """Close the client"""
-        pass
+        """Close the client and release the pooled connections it holds"""
+        self.session.close()
+
+    def add_hook(self, hook):
+        """Register a RequestHook to be notified of every request made by the client"""
+        self.hooks.append(hook)
+
+    def _notify(self, event, *args):
+        for hook in self.hooks:
+            getattr(hook, event)(*args)
 
     # helper functions starting here
 
     def perform_query(self, method, path, data = {}, headers = None):
         """set up connection and perform query"""
+        cache_key = None
+        if self.cache is not None and method == 'GET':
+            ttl = self.cache.get_ttl(path)
+            if ttl:
+                cache_key = self.cache.get_key(self._cache_namespace, method, path, data)
+                response = self.cache.get(cache_key)
+                if response is not None:
+                    return response
+        response = self._perform_query(method, path, data, headers)
+        if cache_key is not None:
+            self.cache.put(cache_key, response, ttl)
+        return response
+
+    def perform_batch(self, calls, max_workers = None):
+        """
+        Perform a list of (method, path, data) calls with up to max_workers of them in flight at
+        once, which defaults to the pool size of the client. Returns a BatchResult per call in
+        input order. A failed call does not stop the others; its exception is in the error field.
+        """
+        calls = list(calls)
+        if not calls:
+            return []
+
+        def perform_call(call):
+            try:
+                return BatchResult(self.perform_query(*call), None)
+            except Exception as e: # noqa
+                return BatchResult(None, e)
+
+        pool = ThreadPool(min(max_workers or self.pool_maxsize, len(calls)))
+        try:
+            return pool.map(perform_call, calls)
+        finally:
+            pool.close()
+            pool.join()
+
+    def _perform_query(self, method, path, data, headers):
         if headers is None:
             headers = self.default_headers
+        headers = dict(headers)
+        if isinstance(data, (bytearray, memoryview)):
+            body = data
+        else:
+            body = json.dumps(data)
+        if _matches(path, self.uncompressed_response_paths):
+            headers['Accept-Encoding'] = 'identity'
+        else:
+            headers['Accept-Encoding'] = 'gzip, deflate'
+        if len(body) >= self.compress_min_bytes and _matches(path, self.compress_request_paths):
+            body = gzip_compress(body)
+            headers['Content-Encoding'] = 'gzip'
 
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore", exceptions.InsecureRequestWarning)
-            resp = self.session.request(method, self.url + path, data = json.dumps(data),
-                verify = self.verify, headers = headers)
+        attempt = 0
+        while True:
+            attempt += 1
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(path)
+            self._notify('on_request', method, path, len(body))
+            start_time = time.time()
+            try:
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore", exceptions.InsecureRequestWarning)
+                    resp = self.session.request(method, self.url + path, data = body,
+                        verify = self.verify, headers = headers)
+                resp.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                self._notify('on_error', method, path, e, time.time() - start_time)
+                if not self.retry_policy.should_retry(attempt, method, path, e):
+                    raise
+                delay = self.retry_policy.get_backoff(attempt, e.response)
+                self._notify('on_retry', method, path, attempt, delay, e)
+                time.sleep(delay)
+            else:
+                self._notify('on_response', method, path, resp, time.time() - start_time)
+                return resp.json()
 
-        try:
-            resp.raise_for_status()
-        except requests.exceptions.HTTPError, e:
-            raise e
-        return resp.json()
+
+class AsyncApiClient(object):
+    """
+    Non-blocking counterpart of ApiClient.
+
+    perform_query returns immediately with a multiprocessing.pool.AsyncResult while the call runs
+    on a bounded pool of worker threads sharing the connection pool of the wrapped ApiClient.
+    Because the service classes only forward to perform_query, wrapping an AsyncApiClient makes
+    every service method asynchronous with an unchanged signature:
+
+      jobs = JobsService(AsyncApiClient(client))
+      pending = [jobs.get_run(run_id) for run_id in run_ids]
+      runs = [result.get() for result in pending]
+
+    result.get() returns the response or raises the error of the call. max_workers defaults to
+    the pool size of the wrapped client.
+    """
+    def __init__(self, api_client, max_workers = None):
+        self.api_client = api_client
+        self.max_workers = max_workers or api_client.pool_maxsize
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPool(self.max_workers)
+            return self._pool
+
+    def close(self):
+        """Wait for the outstanding calls and stop the worker threads"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool.join()
+                self._pool = None
+
+    def perform_query(self, method, path, data = {}, headers = None):
+        """start the query and return an AsyncResult for its response"""
+        return self._get_pool().apply_async(self.api_client.perform_query,
+            (method, path, data, headers))
+
+
+class CallRecorder(object):
+    """
+    Client whose perform_query returns the (method, path, data) call it was asked to make.
+
+    Combined with the service classes, it builds the calls of ApiClient.perform_batch:
+
+      jobs = JobsService(CallRecorder())
+      results = client.perform_batch([jobs.get_job(job_id) for job_id in job_ids])
+    """
+    def perform_query(self, method, path, data = {}, headers = None):
+        return (method, path, data)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+
+# Databricks CLI
+# Copyright 2017 Databricks, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"), except
+# that the use of services to which certain application programming
+# interfaces (each, an "API") connect requires that the user first obtain
+# a license for the use of the APIs from Databricks, Inc. ("Databricks"),
+# by creating an account at www.databricks.com and agreeing to either (a)
+# the Community Edition Terms of Service, (b) the Databricks Terms of
+# Service, or (c) another written agreement between Licensee and Databricks
+# for the use of the APIs.
+#
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Response cache used by the ApiClient for GET endpoints whose results rarely change
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from collections import OrderedDict
+
+from databricks_cli.files import make_dirs, replace_file, remove_file, stat_files, \
+    evict_least_recently_used
+
+# Seconds for which the responses of each endpoint are cached by default. Cached responses are
+# never invalidated by writes, so endpoints whose results the CLI itself changes, such as
+# /workspace/list, are only cached if configured explicitly.
+DEFAULT_TTLS = {
+    '/clusters/spark-versions': 24 * 60 * 60,
+    '/clusters/list-node-types': 24 * 60 * 60,
+    '/clusters/list-zones': 24 * 60 * 60,
+}
+DISK_ENTRY_SUFFIX = '.json'
+
+
+class ResponseCache(object):
+    """
+    Two level cache of API responses: an in-memory LRU of up to max_entries responses in front of
+    an optional on-disk store under cache_dir holding up to max_disk_bytes.
+
+    ttls maps endpoint paths to the number of seconds their responses stay fresh. Endpoints that
+    are not in ttls are never cached. The disk store can be shared by concurrent processes: files
+    are replaced atomically, hits refresh their modification time and the least recently used
+    files are evicted once the store is over its size.
+    """
+    def __init__(self, ttls=None, cache_dir=None, max_entries=256, max_disk_bytes=64 * 2**20):
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_disk_bytes = max_disk_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_ttl(self, path):
+        return self.ttls.get(path)
+
+    @staticmethod
+    def get_key(namespace, method, path, data):
+        """
+        Returns the cache key of a call. namespace should identify the workspace and the caller
+        so that responses are never shared between credentials.
+        """
+        serialized = json.dumps([namespace, method, path, data], sort_keys=True)
+        return hashlib.sha256(serialized).hexdigest()
+
+    def get(self, key):
+        """
+        Returns the cached response for key or None if there is no fresh one.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None and entry[0] > now:
+                self._entries[key] = entry
+                return json.loads(entry[1])
+        entry = self._read_from_disk(key)
+        if entry is None or entry[0] <= now:
+            return None
+        self._put_in_memory(key, entry)
+        return json.loads(entry[1])
+
+    def put(self, key, response, ttl):
+        entry = (time.time() + ttl, json.dumps(response))
+        self._put_in_memory(key, entry)
+        self._write_to_disk(key, entry)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.cache_dir is not None:
+            for path, _, _ in stat_files(self.cache_dir, DISK_ENTRY_SUFFIX):
+                remove_file(path)
+
+    def _put_in_memory(self, key, entry):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _get_disk_path(self, key):
+        return os.path.join(self.cache_dir, key + DISK_ENTRY_SUFFIX)
+
+    def _read_from_disk(self, key):
+        if self.cache_dir is None:
+            return None
+        path = self._get_disk_path(key)
+        try:
+            with open(path, 'r') as f:
+                expires, serialized = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+        try:
+            os.utime(path, None)
+        except OSError:
+            # A read-only cache is still served, it just does not track recent use.
+            pass
+        return expires, serialized.encode('utf-8')
+
+    def _write_to_disk(self, key, entry):
+        """
+        Stores entry on disk. If the cache directory is not writable the entry is only kept in
+        memory, since the call it caches has succeeded already.
+        """
+        if self.cache_dir is None:
+            return
+        tmp_path = None
+        try:
+            make_dirs(self.cache_dir)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entry, f)
+            replace_file(tmp_path, self._get_disk_path(key))
+            evict_least_recently_used(self.cache_dir, DISK_ENTRY_SUFFIX, self.max_disk_bytes)
+        except (IOError, OSError):
+            if tmp_path is not None:
+                try:
+                    remove_file(tmp_path)
+                except OSError:
+                    pass
+
+
+def parse_ttls(value):
+    """
+    Parses per endpoint TTLs written as a comma separated list of PATH=SECONDS entries,
+    e.g. '/clusters/spark-versions=86400,/workspace/list=60'.
+    """
+    ttls = {}
+    for entry in value.split(','):
+        entry = entry.strip()
+        if entry:
+            path, ttl = entry.split('=')
+            ttls[path.strip()] = float(ttl)
+    return ttls
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+
+# Databricks CLI
+# Copyright 2017 Databricks, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"), except
+# that the use of services to which certain application programming
+# interfaces (each, an "API") connect requires that the user first obtain
+# a license for the use of the APIs from Databricks, Inc. ("Databricks"),
+# by creating an account at www.databricks.com and agreeing to either (a)
+# the Community Edition Terms of Service, (b) the Databricks Terms of
+# Service, or (c) another written agreement between Licensee and Databricks
+# for the use of the APIs.
+#
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Instrumentation hooks called by the ApiClient around every request
+"""
+
+import bisect
+import threading
+
+# Upper bounds in seconds of the latency histogram buckets kept by RequestStats.
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float('inf'))
+
+
+class RequestHook(object):
+    """
+    Base class of ApiClient hooks. Subclasses override the events they are interested in.
+
+    Every attempt of a call triggers on_request followed by either on_response or on_error.
+    on_retry is triggered before waiting to attempt a failed call again. Hooks may be called
+    concurrently from several threads.
+    """
+    def on_request(self, method, path, bytes_sent):
+        pass
+
+    def on_response(self, method, path, response, elapsed):
+        pass
+
+    def on_error(self, method, path, exception, elapsed):
+        pass
+
+    def on_retry(self, method, path, attempt, delay, exception):
+        pass
+
+
+class EndpointStats(object):
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.total_latency = 0.0
+        self.latency_histogram = [0] * len(LATENCY_BUCKETS)
+
+    def record_latency(self, elapsed):
+        self.total_latency += elapsed
+        self.latency_histogram[bisect.bisect_left(LATENCY_BUCKETS, elapsed)] += 1
+
+    def to_json(self):
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'retries': self.retries,
+            'bytes_sent': self.bytes_sent,
+            'bytes_received': self.bytes_received,
+            'total_latency': self.total_latency,
+            'latency_histogram': zip(LATENCY_BUCKETS, self.latency_histogram),
+        }
+
+
+def _get_bytes_received(response):
+    # Content-Length is the size of the body on the wire, before it is decompressed.
+    length = response.headers.get('Content-Length', '')
+    if length.isdigit():
+        return int(length)
+    return len(response.content)
+
+
+class RequestStats(RequestHook):
+    """
+    Counts requests, errors, retries, bytes sent and received and keeps a latency histogram per
+    endpoint. Bytes are counted as sent over the wire, i.e. after compression.
+    """
+    def __init__(self):
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def _get(self, path):
+        if path not in self._endpoints:
+            self._endpoints[path] = EndpointStats()
+        return self._endpoints[path]
+
+    def on_request(self, method, path, bytes_sent):
+        with self._lock:
+            stats = self._get(path)
+            stats.requests += 1
+            stats.bytes_sent += bytes_sent
+
+    def on_response(self, method, path, response, elapsed):
+        with self._lock:
+            stats = self._get(path)
+            stats.bytes_received += _get_bytes_received(response)
+            stats.record_latency(elapsed)
+
+    def on_error(self, method, path, exception, elapsed):
+        with self._lock:
+            stats = self._get(path)
+            stats.errors += 1
+            stats.record_latency(elapsed)
+
+    def on_retry(self, method, path, attempt, delay, exception):
+        with self._lock:
+            self._get(path).retries += 1
+
+    def snapshot(self):
+        """
+        Returns the counters of every endpoint called so far, keyed by endpoint path.
+        """
+        with self._lock:
+            return {path: stats.to_json() for path, stats in self._endpoints.items()}
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
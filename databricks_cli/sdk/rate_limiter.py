@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+
+# Databricks CLI
+# Copyright 2017 Databricks, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"), except
+# that the use of services to which certain application programming
+# interfaces (each, an "API") connect requires that the user first obtain
+# a license for the use of the APIs from Databricks, Inc. ("Databricks"),
+# by creating an account at www.databricks.com and agreeing to either (a)
+# the Community Edition Terms of Service, (b) the Databricks Terms of
+# Service, or (c) another written agreement between Licensee and Databricks
+# for the use of the APIs.
+#
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Client side rate limiting shared by all threads using an ApiClient
+"""
+
+import threading
+import time
+
+
+class TokenBucket(object):
+    """
+    Allows rate requests per second on average and bursts of up to burst requests.
+
+    Callers that find the bucket empty reserve the next token anyway and sleep until it is due,
+    so waiting threads are served in order without polling.
+    """
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst) if burst else max(1.0, self.rate)
+        self._tokens = self.burst
+        self._last_refill = time.time()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.time()
+            self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate
+        if wait > 0:
+            time.sleep(wait)
+
+
+class RateLimiter(object):
+    """
+    Limits the rate at which an ApiClient sends requests.
+
+    rate and burst apply to all requests. endpoint_limits maps endpoint prefixes such as
+    '/dbfs/' to a (rate, burst) pair that additionally applies to the requests under that prefix.
+    If several prefixes match a path, the longest one is used.
+    """
+    def __init__(self, rate=None, burst=None, endpoint_limits=None):
+        self._bucket = TokenBucket(rate, burst) if rate else None
+        self._endpoint_buckets = sorted(
+            [(prefix, TokenBucket(r, b)) for prefix, (r, b) in (endpoint_limits or {}).items()],
+            key=lambda prefix_and_bucket: len(prefix_and_bucket[0]), reverse=True)
+
+    def acquire(self, path):
+        """
+        Blocks until a request to path may be sent.
+        """
+        for prefix, bucket in self._endpoint_buckets:
+            if path.startswith(prefix):
+                bucket.acquire()
+                break
+        if self._bucket is not None:
+            self._bucket.acquire()
+
+
+def parse_endpoint_limits(value):
+    """
+    Parses per endpoint limits written as a comma separated list of PREFIX=RATE[:BURST] entries,
+    e.g. '/dbfs/=20:40,/jobs/=5'.
+    """
+    endpoint_limits = {}
+    for entry in value.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        prefix, limit = entry.split('=')
+        if ':' in limit:
+            rate, burst = limit.split(':')
+            endpoint_limits[prefix.strip()] = (float(rate), float(burst))
+        else:
+            endpoint_limits[prefix.strip()] = (float(limit), None)
+    return endpoint_limits
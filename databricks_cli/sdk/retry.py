@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+
+# Databricks CLI
+# Copyright 2017 Databricks, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"), except
+# that the use of services to which certain application programming
+# interfaces (each, an "API") connect requires that the user first obtain
+# a license for the use of the APIs from Databricks, Inc. ("Databricks"),
+# by creating an account at www.databricks.com and agreeing to either (a)
+# the Community Edition Terms of Service, (b) the Databricks Terms of
+# Service, or (c) another written agreement between Licensee and Databricks
+# for the use of the APIs.
+#
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Retry policy used by the ApiClient to recover from throttling and transient server errors
+"""
+
+import random
+import time
+
+from email.utils import parsedate_tz, mktime_tz
+
+import requests
+
+# Responses with which the server turns a request away before acting on it. Any call can be
+# retried after one of these. A 503 may come from a proxy after the request reached the server,
+# so it is not one of them.
+REJECTED_STATUS_CODES = frozenset([429])
+# Transient failures after which only idempotent calls are safe to retry.
+RETRYABLE_STATUS_CODES = frozenset([429, 500, 502, 503, 504])
+# POST endpoints that can be repeated without changing their result.
+IDEMPOTENT_POST_PATHS = frozenset(['/dbfs/mkdirs', '/workspace/mkdirs'])
+
+
+class RetryPolicy(object):
+    """
+    Decides whether a failed call is retried and how long to wait before the next attempt.
+
+    The wait grows exponentially from backoff_base seconds up to backoff_cap seconds. With jitter
+    each wait is drawn uniformly below that bound so that concurrent clients spread out their
+    retries. A Retry-After header sent by the server is always honored. Calls that are not
+    idempotent (e.g. /dbfs/add-block or /jobs/create) are only retried when the server throttled
+    them (HTTP 429) or the connection could not be established.
+    """
+    def __init__(self, max_attempts=5, backoff_base=0.5, backoff_cap=30.0, jitter=True):
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.jitter = jitter
+
+    def is_idempotent(self, method, path):
+        return method in ('GET', 'HEAD') or path in IDEMPOTENT_POST_PATHS
+
+    def should_retry(self, attempt, method, path, exception):
+        """
+        Returns whether the call should be attempted again after its attempt-th try failed with
+        exception.
+        """
+        if attempt >= self.max_attempts:
+            return False
+        if isinstance(exception, requests.exceptions.HTTPError):
+            status_code = exception.response.status_code
+            if status_code in REJECTED_STATUS_CODES:
+                return True
+            return status_code in RETRYABLE_STATUS_CODES and self.is_idempotent(method, path)
+        if isinstance(exception, requests.exceptions.ConnectTimeout):
+            return True
+        if isinstance(exception, (requests.exceptions.ConnectionError,
+                                  requests.exceptions.Timeout)):
+            return self.is_idempotent(method, path)
+        return False
+
+    def get_backoff(self, attempt, response=None):
+        """
+        Returns the number of seconds to wait after the attempt-th try failed.
+        """
+        delay = min(self.backoff_cap, self.backoff_base * 2 ** (attempt - 1))
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        retry_after = parse_retry_after(response)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+
+def parse_retry_after(response):
+    """
+    Returns the delay in seconds requested by the Retry-After header of response, if any. The
+    header holds either a number of seconds or an HTTP date.
+    """
+    if response is None:
+        return None
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        date = parsedate_tz(value)
+        if date is None:
+            return None
+        return max(0.0, mktime_tz(date) - time.time())
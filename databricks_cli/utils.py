@@ -22,10 +22,15 @@
 # limitations under the License.
 
 import sys
+import threading
+from collections import deque
 from json import dumps as json_dumps, loads as json_loads
+from multiprocessing import TimeoutError
+from multiprocessing.pool import ThreadPool
 
 import click
 import six
+from six.moves import queue
 from requests.exceptions import HTTPError
 
 
@@ -78,3 +83,156 @@ def truncate_string(s, length=100):
     if len(s) <= length:
         return s
     return s[:length] + '...'
+
+
+def parallel_map(function, items, jobs):
+    """
+    Applies function to every item using up to jobs threads. Results are yielded in the order of
+    items as soon as they are available. The first exception raised by function is re-raised.
+    """
+    if jobs <= 1:
+        for item in items:
+            yield function(item)
+        return
+    pool = ThreadPool(jobs)
+    try:
+        results = pool.imap(function, items)
+        while True:
+            # Waiting with a timeout keeps the caller interruptible on Python 2.
+            try:
+                yield results.next(1)
+            except TimeoutError:
+                continue
+            except StopIteration:
+                return
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def bounded_map(function, items, jobs):
+    """
+    Like parallel_map, but only applies function to up to jobs items ahead of the caller, so
+    that at most jobs results are held at once. Used to read ahead of a streaming consumer.
+    """
+    if jobs <= 1:
+        for item in items:
+            yield function(item)
+        return
+    pool = ThreadPool(jobs)
+    pending = deque()
+
+    def next_result():
+        result = pending.popleft()
+        # Waiting with a timeout keeps the caller interruptible on Python 2.
+        while not result.ready():
+            result.wait(1)
+        return result.get()
+
+    try:
+        for item in items:
+            pending.append(pool.apply_async(function, (item,)))
+            if len(pending) >= jobs:
+                yield next_result()
+        while pending:
+            yield next_result()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def leaf_directories(paths):
+    """
+    Returns the /-separated directory paths that are not a parent of another one of paths, in
+    sorted order. Since mkdirs creates parent directories, creating the leaves creates them all.
+    """
+    # Sorting by components puts every directory right before its first descendant.
+    paths = sorted(set(paths), key=lambda path: path.split('/'))
+    return [path for path, next_path in zip(paths, paths[1:] + [None])
+            if next_path is None or not next_path.startswith(path.rstrip('/') + '/')]
+
+
+def mkdirs_leaf_directories(dirs, mkdirs, key, jobs=1, is_conflict=lambda error: True):
+    """
+    Creates dirs with one mkdirs call per leaf directory, up to jobs at a time. key returns the
+    /-separated path of a directory. If a leaf cannot be created because mkdirs raised an
+    HTTPError for which is_conflict is true, its directories are created top-down to find the one
+    that fails. Other errors are raised. Returns the directories that could not be created.
+    """
+    def try_mkdirs(directory):
+        try:
+            mkdirs(directory)
+        except HTTPError as e:
+            if is_conflict(e):
+                return e
+            raise e
+        return None
+
+    def is_under(path, parent):
+        return path == parent or path.startswith(parent.rstrip('/') + '/')
+
+    dirs = {key(directory): directory for directory in dirs}
+    leaves = leaf_directories(dirs)
+    failed = []
+    errors = list(parallel_map(lambda leaf: try_mkdirs(dirs[leaf]), leaves, jobs))
+    for leaf, leaf_error in zip(leaves, errors):
+        if leaf_error is None or any(is_under(leaf, f) for f in failed):
+            continue
+        for ancestor in sorted((d for d in dirs if is_under(leaf, d)), key=len):
+            ancestor_error = try_mkdirs(dirs[ancestor])
+            if ancestor_error is not None:
+                click.echo(ancestor_error.response.json())
+                failed.append(ancestor)
+                break
+    return [dirs[path] for path in failed]
+
+
+_END_OF_ITEMS = object()
+
+
+def _put_unless_stopped(item_queue, item, stopped):
+    while not stopped.is_set():
+        try:
+            item_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def prefetch(items, depth):
+    """
+    Iterates over items on a background thread, staying up to depth items ahead of the caller.
+    Used to overlap producing items, e.g. reading and encoding blocks of a file, with consuming
+    them. An exception raised while producing an item is re-raised to the caller.
+    """
+    item_queue = queue.Queue(depth)
+    stopped = threading.Event()
+
+    def produce():
+        try:
+            for item in items:
+                if not _put_unless_stopped(item_queue, (item, None), stopped):
+                    return
+        except Exception: #  NOQA
+            # Handed to the consumer, which re-raises it.
+            _put_unless_stopped(item_queue, (None, sys.exc_info()), stopped)
+            return
+        _put_unless_stopped(item_queue, (_END_OF_ITEMS, None), stopped)
+
+    producer = threading.Thread(target=produce)
+    producer.daemon = True
+    producer.start()
+    try:
+        while True:
+            try:
+                item, exc_info = item_queue.get(timeout=1)
+            except queue.Empty:
+                continue
+            if exc_info is not None:
+                six.reraise(*exc_info)
+            if item is _END_OF_ITEMS:
+                return
+            yield item
+    finally:
+        stopped.set()
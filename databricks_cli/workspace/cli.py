@@ -24,11 +24,11 @@
 import os
 import click
 from tabulate import tabulate
-from requests.exceptions import HTTPError
 
-from databricks_cli.utils import eat_exceptions, CONTEXT_SETTINGS
+from databricks_cli.utils import eat_exceptions, parallel_map, mkdirs_leaf_directories, \
+    CONTEXT_SETTINGS
 from databricks_cli.version import print_version_callback, version
-from databricks_cli.configure.config import require_config
+from databricks_cli.configure.config import require_config, set_concurrency
 from databricks_cli.dbfs.exceptions import LocalFileExistsException
 from databricks_cli.workspace.api import list_objects, mkdirs, import_workspace, export_workspace, \
     delete, get_status
@@ -178,34 +178,56 @@ def export_dir_cli(source_path, target_path, overwrite):
     _export_dir_helper(source_path, target_path, overwrite)
 
 
-def _import_dir_helper(source_path, target_path, overwrite, exclude_hidden_files):
-    # Try doing the os.listdir before creating the dir in Databricks.
-    filenames = os.listdir(source_path)
-    if exclude_hidden_files:
-        # for now, just exclude hidden files or directories based on starting '.'
-        filenames = [f for f in filenames if not f.startswith('.')]
-    try:
-        mkdirs(target_path)
-    except HTTPError as e:
-        click.echo(e.response.json())
-        return
-    for filename in filenames:
-        cur_src = os.path.join(source_path, filename)
-        # don't use os.path.join here since it will set \ on Windows
-        cur_dst = target_path.rstrip('/') + '/' + filename
-        if os.path.isdir(cur_src):
-            _import_dir_helper(cur_src, cur_dst, overwrite, exclude_hidden_files)
-        elif os.path.isfile(cur_src):
-            ext = WorkspaceLanguage.get_extension(cur_src)
-            if ext != '':
-                cur_dst = cur_dst[:-len(ext)]
-                (language, file_format) = WorkspaceLanguage.to_language_and_format(cur_src)
-                import_workspace(cur_src, cur_dst, language, file_format, overwrite)
-                click.echo('{} -> {}'.format(cur_src, cur_dst))
-            else:
-                extensions = ', '.join(WorkspaceLanguage.EXTENSIONS)
-                click.echo(('{} does not have a valid extension of {}. Skip this file and ' +
-                            'continue.').format(cur_src, extensions))
+def _import_file(cur_src, cur_dst, overwrite):
+    ext = WorkspaceLanguage.get_extension(cur_src)
+    if ext != '':
+        cur_dst = cur_dst[:-len(ext)]
+        (language, file_format) = WorkspaceLanguage.to_language_and_format(cur_src)
+        import_workspace(cur_src, cur_dst, language, file_format, overwrite)
+        return '{} -> {}'.format(cur_src, cur_dst)
+    else:
+        extensions = ', '.join(WorkspaceLanguage.EXTENSIONS)
+        return ('{} does not have a valid extension of {}. Skip this file and ' +
+                'continue.').format(cur_src, extensions)
+
+
+def _list_imports(source_path, target_path, exclude_hidden_files):
+    """
+    Returns the workspace directories of the source tree and the (local path, workspace path) of
+    its files.
+    """
+    dirs = []
+    imports = []
+    for dirpath, dirnames, filenames in os.walk(source_path, followlinks=True):
+        if exclude_hidden_files:
+            # for now, just exclude hidden files or directories based on starting '.'
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+            filenames = [f for f in filenames if not f.startswith('.')]
+        dirnames.sort()
+        relpath = os.path.relpath(dirpath, source_path)
+        cur_target = target_path
+        if relpath != os.curdir:
+            # don't use os.path.join here since it will set \ on Windows
+            cur_target = target_path.rstrip('/') + '/' + relpath.replace(os.sep, '/')
+        dirs.append(cur_target)
+        for filename in sorted(filenames):
+            cur_src = os.path.join(dirpath, filename)
+            if os.path.isfile(cur_src):
+                imports.append((cur_src, cur_target.rstrip('/') + '/' + filename))
+    return dirs, imports
+
+
+def _import_dir_helper(source_path, target_path, overwrite, exclude_hidden_files, jobs=1):
+    """
+    Creates the directories of the source tree first, with a mkdirs call per leaf directory, and
+    then imports its files with up to jobs concurrent imports.
+    """
+    dirs, imports = _list_imports(source_path, target_path, exclude_hidden_files)
+    failed = mkdirs_leaf_directories(dirs, mkdirs, lambda path: path, jobs)
+    imports = [i for i in imports
+               if not any(i[1].startswith(f.rstrip('/') + '/') for f in failed)]
+    for message in parallel_map(lambda i: _import_file(i[0], i[1], overwrite), imports, jobs):
+        click.echo(message)
 
 
 @click.command(context_settings=CONTEXT_SETTINGS,
@@ -214,16 +236,19 @@ def _import_dir_helper(source_path, target_path, overwrite, exclude_hidden_files
 @click.argument('target_path')
 @click.option('--overwrite', '-o', is_flag=True, default=False)
 @click.option('--exclude-hidden-files', '-e', is_flag=True, default=False)
+@click.option('--jobs', '-j', type=click.IntRange(min=1), default=1, show_default=True,
+              help='Number of directories to create and files to import concurrently.')
 @require_config
 @eat_exceptions
-def import_dir_cli(source_path, target_path, overwrite, exclude_hidden_files):
+def import_dir_cli(source_path, target_path, overwrite, exclude_hidden_files, jobs):
     """
     Recursively imports a directory from local to the Databricks workspace.
 
     Only directories and files with the extensions .scala, .py, .sql, .r, .R, .ipynb are imported.
     When imported, these extensions will be stripped off the name of the notebook.
     """
-    _import_dir_helper(source_path, target_path, overwrite, exclude_hidden_files)
+    set_concurrency(jobs)
+    _import_dir_helper(source_path, target_path, overwrite, exclude_hidden_files, jobs)
 
 
 @click.group(context_settings=CONTEXT_SETTINGS,
@@ -23,9 +23,12 @@
 
 # pylint:disable=protected-access
 
+import os
+
 import mock
 
 import databricks_cli.configure.config as config
+from databricks_cli.sdk import RequestStats
 
 
 def test_require_config_valid():
@@ -102,3 +105,91 @@ class TestDatabricksConfig(object):
             self.databricks_config_from_token.overwrite()
             from_fs = config.DatabricksConfig.fetch_from_fs()
             assert self.databricks_config_from_token.token == from_fs.token
+
+
+def test_get_api_client_is_shared():
+    config.DatabricksConfig.construct_from_token('https://test-host', 'test-token').overwrite()
+    api_client = config._get_api_client()
+    assert config._get_api_client() is api_client
+    assert config.get_dbfs_client().client is api_client
+    assert config.get_jobs_client().client is api_client
+
+
+def test_get_api_client_new_credentials():
+    config.DatabricksConfig.construct_from_token('https://test-host', 'test-token').overwrite()
+    api_client = config._get_api_client()
+    config.DatabricksConfig.construct_from_token('https://test-host', 'other-token').overwrite()
+    assert config._get_api_client() is not api_client
+
+
+def test_config_is_parsed_once():
+    config.DatabricksConfig.construct_from_token('https://test-host', 'test-token').overwrite()
+    with mock.patch.object(config.DatabricksConfig, 'fetch_from_fs',
+                           wraps=config.DatabricksConfig.fetch_from_fs) as fetch_from_fs_mock:
+        api_client = config._get_api_client()
+        for _ in range(10):
+            assert config._get_api_client() is api_client
+            assert config.get_config().token == 'test-token'
+        assert fetch_from_fs_mock.call_count == 1
+
+        config.DatabricksConfig.construct_from_token('https://test-host', 'new-token').overwrite()
+        assert config.get_config().token == 'new-token'
+        assert fetch_from_fs_mock.call_count == 2
+
+
+def test_close_api_clients():
+    config.DatabricksConfig.construct_from_token('https://test-host', 'test-token').overwrite()
+    api_client = config._get_api_client()
+    with mock.patch.object(api_client, 'close') as close_mock:
+        config.close_api_clients()
+        assert close_mock.call_count == 1
+    assert config._get_api_client() is not api_client
+
+
+def test_get_client_option():
+    conf = config.DatabricksConfig.construct_from_token('test-host', 'test-token')
+    assert config.get_client_option(conf, config.POOL_SIZE, int, 10) == 10
+    conf._config.set(config.DEFAULT_SECTION, config.POOL_SIZE, '20')
+    assert config.get_client_option(conf, config.POOL_SIZE, int, 10) == 20
+    with mock.patch.dict('os.environ', {'DATABRICKS_POOL_SIZE': '30'}):
+        assert config.get_client_option(conf, config.POOL_SIZE, int, 10) == 30
+        with mock.patch.dict(config._client_options, {config.POOL_SIZE: 40}):
+            assert config.get_client_option(conf, config.POOL_SIZE, int, 10) == 40
+
+
+def test_pool_size_follows_concurrency():
+    config.DatabricksConfig.construct_from_token('https://test-host', 'test-token').overwrite()
+    with mock.patch.object(config, '_concurrency', [64]):
+        api_client = config._get_api_client()
+        adapter = api_client.session.get_adapter('https://test-host')
+        assert adapter.poolmanager.connection_pool_kw['maxsize'] == 64
+
+
+def test_rate_limit_settings():
+    conf = config.DatabricksConfig.construct_from_token('https://test-host', 'test-token')
+    conf._config.set(config.DEFAULT_SECTION, config.RATE_LIMIT_ENDPOINTS, '/dbfs/=20:40')
+    conf.overwrite()
+    assert config._get_api_client().rate_limiter is not None
+    config.DatabricksConfig.construct_from_token('https://test-host', 'test-token').overwrite()
+    assert config._get_api_client().rate_limiter is None
+
+
+def test_cache_settings():
+    config.DatabricksConfig.construct_from_token('https://test-host', 'test-token').overwrite()
+    assert config._get_api_client().cache is None
+    with mock.patch.dict(config._client_options, {config.CACHE: True}):
+        cache = config._get_api_client().cache
+        assert cache.cache_dir == os.path.join(config.DatabricksConfig.home, '.databricks',
+                                               'cache')
+        assert cache.get_ttl('/clusters/list-zones') == 24 * 60 * 60
+        assert cache.get_ttl('/workspace/list') is None
+
+
+def test_request_hooks_setting():
+    conf = config.DatabricksConfig.construct_from_token('https://test-host', 'test-token')
+    conf._config.set(config.DEFAULT_SECTION, config.REQUEST_HOOKS,
+                     'databricks_cli.sdk.hooks:RequestStats')
+    conf.overwrite()
+    hooks = config._get_api_client().hooks
+    assert len(hooks) == 2
+    assert all(isinstance(hook, RequestStats) for hook in hooks)
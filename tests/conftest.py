@@ -25,7 +25,8 @@ import tempfile
 import pytest
 import mock
 
-from databricks_cli.configure.config import DatabricksConfig
+from databricks_cli.configure.config import DatabricksConfig, close_api_clients, \
+    _client_options
 
 
 @pytest.fixture(autouse=True)
@@ -34,3 +35,10 @@ def mock_conf_dir():
     with mock.patch.object(DatabricksConfig, 'home', path):
         yield
     shutil.rmtree(path)
+
+
+@pytest.fixture(autouse=True)
+def reset_api_clients():
+    yield
+    close_api_clients()
+    _client_options.clear()
@@ -21,9 +21,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from base64 import b64encode
+from base64 import b64encode, b64decode
 
+import json
 import os
+from StringIO import StringIO
 import requests
 import mock
 import pytest
@@ -47,6 +49,24 @@ def get_resource_does_not_exist_exception():
     return requests.exceptions.HTTPError(response=response)
 
 
+def record_blocks(api_mock, add_block=None):
+    """
+    Records the decoded data of every add-block request sent through api_mock and passes it to
+    add_block if given. The request bodies are reused buffers, so they are decoded as they are
+    sent.
+    """
+    blocks = []
+
+    def perform_query(method, path, data):
+        assert (method, path) == ('POST', '/dbfs/add-block')
+        blocks.append(b64decode(json.loads(data.tobytes())['data']))
+        if add_block is not None:
+            add_block(blocks[-1])
+
+    api_mock.client.perform_query.side_effect = perform_query
+    return blocks
+
+
 class TestFileInfo(object):
     def test_to_row_not_long_form_not_absolute(self):
         file_info = api.FileInfo(TEST_DBFS_PATH, False, 1)
@@ -71,10 +91,10 @@ class TestFileInfo(object):
 
 def test_list_files_exists():
     with mock.patch('databricks_cli.dbfs.api.get_dbfs_client') as get_dbfs_client:
-        json = {
+        list_json = {
             'files': [TEST_FILE_JSON]
         }
-        get_dbfs_client.return_value.list.return_value = json
+        get_dbfs_client.return_value.list.return_value = list_json
         files = api.list_files(TEST_DBFS_PATH)
 
         assert len(files) == 1
@@ -83,8 +103,8 @@ def test_list_files_exists():
 
 def test_list_files_does_not_exist():
     with mock.patch('databricks_cli.dbfs.api.get_dbfs_client') as get_dbfs_client:
-        json = {}
-        get_dbfs_client.return_value.list.return_value = json
+        list_json = {}
+        get_dbfs_client.return_value.list.return_value = list_json
         files = api.list_files(TEST_DBFS_PATH)
 
         assert len(files) == 0
@@ -122,15 +142,31 @@ def test_put_file(tmpdir):
     with open(test_file_path, 'w') as f:
         f.write('test')
 
-    with mock.patch('databricks_cli.dbfs.api.get_dbfs_client') as get_dbfs_client:
+    with mock.patch('databricks_cli.dbfs.api.get_dbfs_client') as get_dbfs_client, \
+            mock.patch('databricks_cli.dbfs.api.SMALL_FILE_THRESHOLD_BYTES', 0):
         api_mock = get_dbfs_client.return_value
         test_handle = 0
         api_mock.create.return_value = {'handle': test_handle}
+        blocks = record_blocks(api_mock)
         api.put_file(test_file_path, TEST_DBFS_PATH, True)
 
-        assert api_mock.add_block.call_count == 1
-        assert test_handle == api_mock.add_block.call_args[0][0]
-        assert b64encode('test') == api_mock.add_block.call_args[0][1]
+        assert blocks == ['test']
+        body = json.loads(api_mock.client.perform_query.call_args[1]['data'].tobytes())
+        assert body['handle'] == test_handle
+
+
+def test_put_file_small(tmpdir):
+    test_file_path = os.path.join(tmpdir.strpath, 'test')
+    with open(test_file_path, 'w') as f:
+        f.write('test')
+
+    with mock.patch('databricks_cli.dbfs.api.get_dbfs_client') as get_dbfs_client:
+        api_mock = get_dbfs_client.return_value
+        api.put_file(test_file_path, TEST_DBFS_PATH, True)
+
+        api_mock.put.assert_called_once_with(TEST_DBFS_PATH.absolute_path, b64encode('test'), True)
+        assert api_mock.create.call_count == 0
+        assert api_mock.add_block.call_count == 0
 
 
 def test_get_file_check_overwrite(tmpdir):
@@ -155,3 +191,509 @@ def test_get_file(tmpdir):
 
         with open(test_file_path, 'r') as f:
             assert f.read() == 'x'
+
+
+def test_hash_file():
+    with mock.patch('databricks_cli.dbfs.api.get_dbfs_client') as get_dbfs_client, \
+            mock.patch('databricks_cli.dbfs.api.BUFFER_SIZE_BYTES', 2):
+        api_mock = get_dbfs_client.return_value
+        api_mock.read.side_effect = lambda path, offset, length: \
+            {'bytes_read': 2, 'data': b64encode('abcd'[offset:offset + length])}
+        assert api.hash_file(TEST_DBFS_PATH, 4) == api.hashlib.sha256('abcd').hexdigest()
+        assert api_mock.read.call_count == 2
+
+
+def test_put_file_multiple_blocks(tmpdir):
+    test_file_path = os.path.join(tmpdir.strpath, 'test')
+    contents = ''.join(chr(i % 256) for i in range(5 * 1000))
+    with open(test_file_path, 'wb') as f:
+        f.write(contents)
+
+    with mock.patch('databricks_cli.dbfs.api.get_dbfs_client') as get_dbfs_client, \
+            mock.patch('databricks_cli.dbfs.api.BUFFER_SIZE_BYTES', 1000), \
+            mock.patch('databricks_cli.dbfs.api.SMALL_FILE_THRESHOLD_BYTES', 0):
+        api_mock = get_dbfs_client.return_value
+        api_mock.create.return_value = {'handle': 0}
+        blocks = record_blocks(api_mock)
+        api.put_file(test_file_path, TEST_DBFS_PATH, True)
+
+        assert blocks == [contents[i:i + 1000] for i in range(0, 5000, 1000)]
+        assert api_mock.close.call_count == 1
+
+
+def test_block_body():
+    contents = ''.join(chr(i % 256) for i in range(1000))
+    with mock.patch('databricks_cli.dbfs.api.ENCODE_CHUNK_BYTES', 30):
+        body = api.BlockBody(7, 1000)
+        assert json.loads(body.fill(contents).tobytes()) == \
+            {'handle': 7, 'data': b64encode(contents)}
+        assert json.loads(body.fill(contents[:100]).tobytes()) == \
+            {'handle': 7, 'data': b64encode(contents[:100])}
+
+
+def test_put_file_reuses_bodies(tmpdir):
+    test_file_path = os.path.join(tmpdir.strpath, 'test')
+    contents = ''.join(chr(i % 251) for i in range(20 * 100 + 50))
+    with open(test_file_path, 'wb') as f:
+        f.write(contents)
+
+    with mock.patch('databricks_cli.dbfs.api.get_dbfs_client') as get_dbfs_client, \
+            mock.patch('databricks_cli.dbfs.api.BUFFER_SIZE_BYTES', 100), \
+            mock.patch('databricks_cli.dbfs.api.SMALL_FILE_THRESHOLD_BYTES', 0), \
+            mock.patch('databricks_cli.dbfs.api.BlockBody', wraps=api.BlockBody) as body_mock:
+        api_mock = get_dbfs_client.return_value
+        api_mock.create.return_value = {'handle': 0}
+        blocks = record_blocks(api_mock)
+        api.put_file(test_file_path, TEST_DBFS_PATH, True)
+
+        assert ''.join(blocks) == contents
+        assert len(blocks) == 21
+        assert body_mock.call_count == api.UPLOAD_PIPELINE_DEPTH + 2
+
+
+def test_encode_blocks_after_limit():
+    # The second block was read before the sizer was limited, but its buffer is allocated after.
+    block_sizer = api.BlockSizer(100, 1000)
+
+    def blocks():
+        yield 'a' * 1000
+        block = 'b' * 1000
+        block_sizer.limit(500)
+        yield block
+
+    bodies = [body.tobytes() for _, body in api._encode_blocks(blocks(), 0, block_sizer)]
+    assert [b64decode(json.loads(body)['data']) for body in bodies] == ['a' * 1000, 'b' * 1000]
+
+
+class TestPutStream(object):
+    contents = ''.join(chr(i % 256) for i in range(2500))
+
+    def put_stream(self, source):
+        with mock.patch('databricks_cli.dbfs.api.get_dbfs_client') as get_dbfs_client, \
+                mock.patch('databricks_cli.dbfs.api.BUFFER_SIZE_BYTES', 1000):
+            api_mock = get_dbfs_client.return_value
+            api_mock.create.return_value = {'handle': 3}
+            blocks = record_blocks(api_mock)
+            stats = api.put_stream(source, TEST_DBFS_PATH, False)
+
+            api_mock.create.assert_called_once_with(TEST_DBFS_PATH.absolute_path, False)
+            api_mock.close.assert_called_once_with(3)
+            assert stats.bytes == len(''.join(blocks))
+            return blocks
+
+    def test_file_like(self):
+        blocks = self.put_stream(StringIO(self.contents))
+        assert blocks == [self.contents[:1000], self.contents[1000:2000], self.contents[2000:]]
+
+    def test_iterable(self):
+        chunks = (self.contents[i:i + 300] for i in range(0, len(self.contents), 300))
+        blocks = self.put_stream(chunks)
+        assert blocks == [self.contents[:1000], self.contents[1000:2000], self.contents[2000:]]
+
+    def test_empty(self):
+        assert self.put_stream(iter([])) == []
+
+
+def get_error(error_code):
+    response = requests.Response()
+    response._content = '{"error_code": "' + error_code + '"}' #  NOQA
+    return requests.exceptions.HTTPError(response=response)
+
+
+class TestBlockSizer(object):
+    def test_fast_link_uses_max_size(self):
+        block_sizer = api.BlockSizer(2**16, 2**20)
+        block_sizer.record(2**20, 0.1)
+        assert block_sizer.block_size == 2**20
+
+    def test_slow_link_uses_smaller_blocks(self):
+        block_sizer = api.BlockSizer(2**16, 2**20, target_seconds=2)
+        block_sizer.record(2**20, 20)
+        assert block_sizer.block_size == 104448
+        for _ in range(5):
+            block_sizer.record(block_sizer.block_size, 100)
+        assert block_sizer.block_size == 2**16
+
+    def test_limit(self):
+        block_sizer = api.BlockSizer(2**16, 2**20)
+        block_sizer.limit(2**15)
+        assert block_sizer.block_size == 2**15
+        assert block_sizer.min_size == 2**15
+        block_sizer.record(2**20, 0.1)
+        assert block_sizer.block_size == 2**15
+
+
+def test_put_file_splits_rejected_blocks(tmpdir):
+    test_file_path = os.path.join(tmpdir.strpath, 'test')
+    contents = ''.join(chr(i % 256) for i in range(3000))
+    with open(test_file_path, 'wb') as f:
+        f.write(contents)
+
+    with mock.patch('databricks_cli.dbfs.api.get_dbfs_client') as get_dbfs_client, \
+            mock.patch('databricks_cli.dbfs.api.SMALL_FILE_THRESHOLD_BYTES', 0):
+        api_mock = get_dbfs_client.return_value
+        api_mock.create.return_value = {'handle': 0}
+
+        def add_block(block):
+            if len(block) > 1500:
+                raise get_error(api.DbfsErrorCodes.MAX_BLOCK_SIZE_EXCEEDED)
+
+        blocks = record_blocks(api_mock, add_block)
+        stats = api.put_file(test_file_path, TEST_DBFS_PATH, True)
+
+        assert blocks[0] == contents
+        assert blocks[1:] == [contents[:1500], contents[1500:]]
+        assert stats.bytes == 3000
+
+
+def test_get_file_limits_read_size(tmpdir):
+    with mock.patch('databricks_cli.dbfs.api.get_dbfs_client') as get_dbfs_client:
+        api_mock = get_dbfs_client.return_value
+        contents = ''.join(chr(i % 256) for i in range(2**20))
+        api_mock.get_status.return_value = {'path': '/test', 'is_dir': False,
+                                            'file_size': len(contents)}
+
+        def read(_path, offset, length):
+            if length > 2**18:
+                raise get_error(api.DbfsErrorCodes.MAX_READ_SIZE_EXCEEDED)
+            return {'bytes_read': length, 'data': b64encode(contents[offset:offset + length])}
+
+        api_mock.read.side_effect = read
+        test_file_path = os.path.join(tmpdir.strpath, 'test')
+        stats = api.get_file(TEST_DBFS_PATH, test_file_path, True)
+
+        assert [c[0][2] for c in api_mock.read.call_args_list] == \
+            [2**20, 2**19] + [2**18] * 4
+        assert stats.bytes == 2**20
+        assert stats.block_size == 2**18
+        with open(test_file_path, 'rb') as f:
+            assert f.read() == contents
+
+
+def test_stats_report_chosen_block_size(tmpdir):
+    # The last block of a file that is not a multiple of the block size is shorter, but the
+    # stats report the block size that was chosen.
+    contents = ''.join(chr(i % 256) for i in range(2500))
+    test_file_path = os.path.join(tmpdir.strpath, 'test')
+    with open(test_file_path, 'wb') as f:
+        f.write(contents)
+
+    with mock.patch('databricks_cli.dbfs.api.get_dbfs_client') as get_dbfs_client, \
+            mock.patch('databricks_cli.dbfs.api.BUFFER_SIZE_BYTES', 1000), \
+            mock.patch('databricks_cli.dbfs.api.MIN_BLOCK_SIZE_BYTES', 1000), \
+            mock.patch('databricks_cli.dbfs.api.SMALL_FILE_THRESHOLD_BYTES', 0):
+        api_mock = get_dbfs_client.return_value
+        api_mock.create.return_value = {'handle': 0}
+        blocks = record_blocks(api_mock)
+        stats = api.put_file(test_file_path, TEST_DBFS_PATH, True)
+        assert [len(block) for block in blocks] == [1000, 1000, 500]
+        assert stats.block_size == 1000
+
+        api_mock.get_status.return_value = {'path': '/test', 'is_dir': False,
+                                            'file_size': len(contents)}
+        api_mock.read.side_effect = lambda path, offset, length: \
+            {'bytes_read': length, 'data': b64encode(contents[offset:offset + length])}
+        stats = api.get_file(TEST_DBFS_PATH, os.path.join(tmpdir.strpath, 'copy'), True)
+        assert [c[0][2] for c in api_mock.read.call_args_list] == [1000, 1000, 500]
+        assert stats.block_size == 1000
+
+
+class GetFileFixtures(object):
+    """
+    A DBFS file of contents served by the read mock, with small blocks and ranges.
+    """
+    contents = ''.join(chr(i % 251) for i in range(10500))
+
+    @pytest.fixture()
+    def api_mock(self):
+        with mock.patch('databricks_cli.dbfs.api.get_dbfs_client') as get_dbfs_client, \
+                mock.patch('databricks_cli.dbfs.api.BUFFER_SIZE_BYTES', 1000), \
+                mock.patch('databricks_cli.dbfs.api.MIN_BLOCK_SIZE_BYTES', 1000), \
+                mock.patch('databricks_cli.dbfs.api.RANGE_SIZE_BYTES', 3000):
+            api_mock = get_dbfs_client.return_value
+            api_mock.get_status.return_value = {'path': '/test', 'is_dir': False,
+                                                'file_size': len(self.contents)}
+            api_mock.read.side_effect = self.read
+            yield api_mock
+
+    def read(self, _path, offset, length):
+        data = self.contents[offset:offset + length]
+        return {'bytes_read': len(data), 'data': b64encode(data)}
+
+
+class TestParallelGetFile(GetFileFixtures):
+    def test_get_ranges(self):
+        with mock.patch('databricks_cli.dbfs.api.BUFFER_SIZE_BYTES', 1000), \
+                mock.patch('databricks_cli.dbfs.api.RANGE_SIZE_BYTES', 3000):
+            assert api._get_ranges(10500, 4) == [(0, 3000), (3000, 6000), (6000, 9000),
+                                                 (9000, 10500)]
+            assert api._get_ranges(2500, 2) == [(0, 2000), (2000, 2500)]
+            assert api._get_ranges(500, 4) == [(0, 500)]
+            assert api._get_ranges(0, 4) == []
+
+    def test_get_file(self, tmpdir, api_mock):
+        test_file_path = os.path.join(tmpdir.strpath, 'test')
+        stats = api.get_file(TEST_DBFS_PATH, test_file_path, True, streams=3)
+
+        assert stats.bytes == len(self.contents)
+        # No request crosses the boundary of a range.
+        assert all(c[0][1] // 3000 == (c[0][1] + c[0][2] - 1) // 3000
+                   for c in api_mock.read.call_args_list)
+        with open(test_file_path, 'rb') as f:
+            assert f.read() == self.contents
+
+    def test_retry_range(self, tmpdir, api_mock):
+        failures = [4000, 4000, 7000]
+
+        def read(path, offset, length):
+            if offset in failures:
+                failures.remove(offset)
+                raise requests.exceptions.ConnectionError()
+            return self.read(path, offset, length)
+
+        api_mock.read.side_effect = read
+        test_file_path = os.path.join(tmpdir.strpath, 'test')
+        api.get_file(TEST_DBFS_PATH, test_file_path, True, streams=2)
+
+        assert [c[0][1] for c in api_mock.read.call_args_list].count(4000) == 3
+        with open(test_file_path, 'rb') as f:
+            assert f.read() == self.contents
+
+    def test_give_up(self, tmpdir, api_mock):
+        def read(path, offset, length):
+            if offset == 4000:
+                raise requests.exceptions.ConnectionError()
+            return self.read(path, offset, length)
+
+        api_mock.read.side_effect = read
+        with pytest.raises(requests.exceptions.ConnectionError):
+            api.get_file(TEST_DBFS_PATH, os.path.join(tmpdir.strpath, 'test'), True, streams=2)
+
+
+class TestResumableGetFile(GetFileFixtures):
+    def test_resume(self, tmpdir, api_mock):
+        def read(path, offset, length):
+            if offset == 3000:
+                raise requests.exceptions.ConnectionError()
+            return self.read(path, offset, length)
+
+        api_mock.read.side_effect = read
+        test_file_path = os.path.join(tmpdir.strpath, 'test')
+        with pytest.raises(requests.exceptions.ConnectionError):
+            api.get_file(TEST_DBFS_PATH, test_file_path, True)
+        assert not os.path.exists(test_file_path)
+        assert os.path.getsize(test_file_path + '.part') == 3000
+
+        api_mock.read.reset_mock()
+        api_mock.read.side_effect = self.read
+        stats = api.get_file(TEST_DBFS_PATH, test_file_path, True)
+
+        assert api_mock.read.call_args_list[0][0][1] == 3000
+        assert stats.bytes == len(self.contents) - 3000
+        with open(test_file_path, 'rb') as f:
+            assert f.read() == self.contents
+        assert os.listdir(tmpdir.strpath) == ['test']
+
+    def test_restart_if_size_changed(self, tmpdir, api_mock):
+        test_file_path = os.path.join(tmpdir.strpath, 'test')
+        with open(test_file_path + '.part', 'wb') as f:
+            f.write('x' * 3000)
+        with open(test_file_path + '.part.json', 'w') as f:
+            json.dump({'size': 20000, 'preallocated': False, 'done': []}, f)
+
+        api.get_file(TEST_DBFS_PATH, test_file_path, True)
+
+        assert api_mock.read.call_args_list[0][0][1] == 0
+        with open(test_file_path, 'rb') as f:
+            assert f.read() == self.contents
+
+    def test_resume_ranges(self, tmpdir, api_mock):
+        failing = [True]
+
+        def read(path, offset, length):
+            if failing[0] and offset >= 3000:
+                raise requests.exceptions.ConnectionError()
+            return self.read(path, offset, length)
+
+        api_mock.read.side_effect = read
+        test_file_path = os.path.join(tmpdir.strpath, 'test')
+        with pytest.raises(requests.exceptions.ConnectionError):
+            api.get_file(TEST_DBFS_PATH, test_file_path, True, streams=2)
+
+        api_mock.read.reset_mock()
+        failing[0] = False
+        api.get_file(TEST_DBFS_PATH, test_file_path, True, streams=2)
+
+        # Only the ranges that did not complete are downloaded again.
+        assert min(c[0][1] for c in api_mock.read.call_args_list) >= 3000
+        with open(test_file_path, 'rb') as f:
+            assert f.read() == self.contents
+
+
+class TestCachedGetFile(GetFileFixtures):
+    def test_get_file_from_cache(self, tmpdir, api_mock):
+        test_file_path = os.path.join(tmpdir.strpath, 'test')
+        with mock.patch.dict(os.environ,
+                             {'DATABRICKS_DBFS_CACHE_DIR': tmpdir.join('cache').strpath}):
+            api.get_file(TEST_DBFS_PATH, test_file_path, True, streams=2)
+            read_count = api_mock.read.call_count
+            stats = api.get_file(TEST_DBFS_PATH, test_file_path, True, streams=2)
+
+        assert stats.bytes == 0
+        assert api_mock.read.call_count == read_count
+        with open(test_file_path, 'rb') as f:
+            assert f.read() == self.contents
+
+
+class TestIterFile(GetFileFixtures):
+    @pytest.mark.usefixtures('api_mock')
+    def test_iter_file(self):
+        blocks = list(api.iter_file(TEST_DBFS_PATH, read_ahead=3))
+
+        assert [len(block) for block in blocks] == [1000] * 10 + [500]
+        assert ''.join(blocks) == self.contents
+
+    def test_iter_file_reads_ahead_only(self, api_mock):
+        blocks = api.iter_file(TEST_DBFS_PATH, read_ahead=3)
+        assert next(blocks) == self.contents[:1000]
+        blocks.close()
+
+        assert api_mock.read.call_count <= 3
+
+    def test_iter_file_empty(self, api_mock):
+        api_mock.get_status.return_value['file_size'] = 0
+        assert list(api.iter_file(TEST_DBFS_PATH)) == []
+        assert api_mock.read.call_count == 0
+
+
+class TestRangeReads(GetFileFixtures):
+    contents = ''.join('line {}\n'.format(i) for i in range(1000))
+
+    @pytest.mark.usefixtures('api_mock')
+    def test_iter_file_range(self):
+        assert ''.join(api.iter_file(TEST_DBFS_PATH, 1500, 2000)) == self.contents[1500:3500]
+        assert ''.join(api.iter_file(TEST_DBFS_PATH, -10)) == self.contents[-10:]
+        assert ''.join(api.iter_file(TEST_DBFS_PATH, 10**6)) == ''
+
+    def test_head_file(self, api_mock):
+        assert api.head_file(TEST_DBFS_PATH, num_bytes=10) == self.contents[:10]
+        api_mock.read.reset_mock()
+        assert api.head_file(TEST_DBFS_PATH, num_lines=3) == 'line 0\nline 1\nline 2\n'
+        assert api_mock.read.call_count == 1
+        assert api.head_file(TEST_DBFS_PATH, num_lines=2000) == self.contents
+
+    def test_tail_file(self, api_mock):
+        assert api.tail_file(TEST_DBFS_PATH, num_bytes=10) == self.contents[-10:]
+        assert api.tail_file(TEST_DBFS_PATH, num_bytes=0) == ''
+        api_mock.read.reset_mock()
+        assert api.tail_file(TEST_DBFS_PATH, num_lines=2) == 'line 998\nline 999\n'
+        assert api_mock.read.call_count == 1
+        assert api_mock.read.call_args[0][1] == len(self.contents) - 1000
+        assert api.tail_file(TEST_DBFS_PATH, num_lines=200) == \
+            ''.join('line {}\n'.format(i) for i in range(800, 1000))
+        assert api.tail_file(TEST_DBFS_PATH, num_lines=2000) == self.contents
+
+    def test_last_lines(self):
+        assert api._last_lines('a\nb\nc', 2) == 'b\nc'
+        assert api._last_lines('a\nb\nc\n', 2) == 'b\nc\n'
+        assert api._last_lines('a\nb', 2) is None
+
+
+class TestPutFileResumable(object):
+    @pytest.fixture(autouse=True)
+    def home(self, tmpdir):
+        with mock.patch('databricks_cli.configure.config.DatabricksConfig.home',
+                        tmpdir.join('home').strpath):
+            yield
+
+    @pytest.fixture()
+    def src(self, tmpdir):
+        src_path = os.path.join(tmpdir.strpath, 'src')
+        with open(src_path, 'wb') as f:
+            f.write('x' * 3000)
+        return src_path
+
+    @pytest.fixture()
+    def api_mock(self):
+        with mock.patch('databricks_cli.dbfs.api.get_dbfs_client') as get_dbfs_client, \
+                mock.patch('databricks_cli.dbfs.api.BUFFER_SIZE_BYTES', 1000):
+            api_mock = get_dbfs_client.return_value
+            api_mock.create.return_value = {'handle': 1}
+
+            def get_status(path):
+                if path == TEST_DBFS_PATH.absolute_path:
+                    raise get_resource_does_not_exist_exception()
+                return {'path': path[len('dbfs:'):], 'is_dir': False, 'file_size': 3000}
+
+            api_mock.get_status.side_effect = get_status
+            yield api_mock
+
+    @staticmethod
+    def fail_blocks(api_mock, errors):
+        """
+        Makes the add-block requests of api_mock raise the next one of errors, or succeed where
+        it is None. Returns the list of blocks sent so far.
+        """
+        errors = list(errors)
+
+        def add_block(_):
+            if errors:
+                error = errors.pop(0)
+                if error is not None:
+                    raise error
+
+        return record_blocks(api_mock, add_block)
+
+    def test_upload(self, src, api_mock):
+        api.put_file_resumable(src, TEST_DBFS_PATH, False)
+
+        staging_path = api_mock.create.call_args[0][0]
+        assert staging_path.startswith(TEST_DBFS_PATH.absolute_path + '.upload-')
+        assert api_mock.client.perform_query.call_count == 3
+        api_mock.close.assert_called_once_with(1)
+        api_mock.move.assert_called_once_with(staging_path, TEST_DBFS_PATH.absolute_path)
+        assert not os.path.exists(api._get_journal_path(src, TEST_DBFS_PATH))
+
+    def test_existing_file(self, src, api_mock):
+        api_mock.get_status.side_effect = None
+        api_mock.get_status.return_value = TEST_FILE_JSON
+        with pytest.raises(api.DbfsFileExistsException):
+            api.put_file_resumable(src, TEST_DBFS_PATH, False)
+
+    def test_resume(self, src, api_mock):
+        blocks = self.fail_blocks(api_mock, [None, requests.exceptions.ConnectionError()])
+        with pytest.raises(requests.exceptions.ConnectionError):
+            api.put_file_resumable(src, TEST_DBFS_PATH, False)
+        journal = api._load_journal(api._get_journal_path(src, TEST_DBFS_PATH))
+        assert journal['offset'] == 1000
+
+        api.put_file_resumable(src, TEST_DBFS_PATH, False)
+
+        assert api_mock.create.call_count == 1
+        assert len(blocks) == 4
+        api_mock.close.assert_called_once_with(1)
+        assert api_mock.move.call_count == 1
+
+    def test_restart_when_source_changed(self, src, api_mock):
+        blocks = self.fail_blocks(api_mock, [None, requests.exceptions.ConnectionError()])
+        with pytest.raises(requests.exceptions.ConnectionError):
+            api.put_file_resumable(src, TEST_DBFS_PATH, False)
+        os.utime(src, (0, 0))
+
+        api.put_file_resumable(src, TEST_DBFS_PATH, False)
+
+        assert api_mock.create.call_count == 2
+        assert len(blocks) == 5
+
+    def test_restart_when_handle_expired(self, src, api_mock):
+        expired = get_error('INVALID_PARAMETER_VALUE')
+        expired.response.status_code = 400
+        blocks = self.fail_blocks(api_mock,
+                                  [None, requests.exceptions.ConnectionError(), expired])
+        with pytest.raises(requests.exceptions.ConnectionError):
+            api.put_file_resumable(src, TEST_DBFS_PATH, False)
+        api.put_file_resumable(src, TEST_DBFS_PATH, False)
+
+        assert api_mock.create.call_count == 2
+        assert len(blocks) == 6
+        assert api_mock.move.call_count == 1
@@ -0,0 +1,124 @@
+# Databricks CLI
+# Copyright 2017 Databricks, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"), except
+# that the use of services to which certain application programming
+# interfaces (each, an "API") connect requires that the user first obtain
+# a license for the use of the APIs from Databricks, Inc. ("Databricks"),
+# by creating an account at www.databricks.com and agreeing to either (a)
+# the Community Edition Terms of Service, (b) the Databricks Terms of
+# Service, or (c) another written agreement between Licensee and Databricks
+# for the use of the APIs.
+#
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+import stat
+
+import mock
+
+from databricks_cli.dbfs.cache import DownloadCache
+from databricks_cli.dbfs.dbfs_path import DbfsPath
+
+TEST_DBFS_PATH = DbfsPath('dbfs:/test')
+
+
+def downloader(contents, downloads):
+    def download(path):
+        downloads.append(path)
+        with open(path, 'wb') as f:
+            f.write(contents)
+    return download
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_fetch(tmpdir):
+    cache = DownloadCache(tmpdir.join('cache').strpath, 100, 'https://host')
+    downloads = []
+    dst_path = tmpdir.join('a').strpath
+    assert not cache.fetch(TEST_DBFS_PATH, 4, dst_path, downloader('test', downloads))
+    assert len(downloads) == 1
+    assert read(dst_path) == 'test'
+
+    os.remove(dst_path)
+    assert cache.fetch(TEST_DBFS_PATH, 4, dst_path, downloader('test', downloads))
+    assert len(downloads) == 1
+    assert read(dst_path) == 'test'
+    entry_path = cache.get_entry_path(TEST_DBFS_PATH, 4)
+    assert os.stat(dst_path).st_ino == os.stat(entry_path).st_ino
+    assert not os.stat(entry_path).st_mode & stat.S_IWUSR
+    assert os.listdir(cache.cache_dir) == [os.path.basename(entry_path)]
+
+
+def test_fetch_keys_by_size_and_namespace(tmpdir):
+    cache_dir = tmpdir.join('cache').strpath
+    downloads = []
+    dst_path = tmpdir.join('a').strpath
+    DownloadCache(cache_dir, 100, 'a').fetch(TEST_DBFS_PATH, 4, dst_path,
+                                             downloader('test', downloads))
+    DownloadCache(cache_dir, 100, 'a').fetch(TEST_DBFS_PATH, 5, dst_path,
+                                             downloader('tests', downloads))
+    DownloadCache(cache_dir, 100, 'b').fetch(TEST_DBFS_PATH, 4, dst_path,
+                                             downloader('test', downloads))
+    assert len(downloads) == 3
+
+
+def test_fetch_overwrites_dst(tmpdir):
+    cache = DownloadCache(tmpdir.join('cache').strpath, 100)
+    dst_path = tmpdir.join('a').strpath
+    cache.fetch(TEST_DBFS_PATH, 4, dst_path, downloader('test', []))
+    os.remove(dst_path)
+    with open(dst_path, 'wb') as f:
+        f.write('old')
+    assert cache.fetch(TEST_DBFS_PATH, 4, dst_path, downloader('test', []))
+    assert read(dst_path) == 'test'
+
+
+def test_fetch_copies_without_hard_links(tmpdir):
+    cache = DownloadCache(tmpdir.join('cache').strpath, 100)
+    dst_path = tmpdir.join('a').strpath
+    cache.fetch(TEST_DBFS_PATH, 4, dst_path, downloader('test', []))
+    os.remove(dst_path)
+    with mock.patch('os.link', side_effect=OSError()):
+        assert cache.fetch(TEST_DBFS_PATH, 4, dst_path, downloader('test', []))
+    assert read(dst_path) == 'test'
+    assert os.stat(dst_path).st_mode & stat.S_IWUSR
+
+
+def test_fetch_large_file(tmpdir):
+    cache = DownloadCache(tmpdir.join('cache').strpath, 3)
+    downloads = []
+    dst_path = tmpdir.join('a').strpath
+    cache.fetch(TEST_DBFS_PATH, 4, dst_path, downloader('test', downloads))
+    assert downloads == [dst_path]
+    assert read(dst_path) == 'test'
+    assert not os.path.exists(cache.get_entry_path(TEST_DBFS_PATH, 4))
+
+
+def test_evict_least_recently_used(tmpdir):
+    cache = DownloadCache(tmpdir.join('cache').strpath, 10)
+    a, b, c = [DbfsPath('dbfs:/' + name) for name in 'abc']
+    for i, dbfs_path in enumerate([a, b]):
+        cache.fetch(dbfs_path, 4, tmpdir.join('dst').strpath, downloader('test', []))
+        os.utime(cache.get_entry_path(dbfs_path, 4), (i, i))
+    # A hit on a makes b the least recently used file.
+    assert cache.fetch(a, 4, tmpdir.join('dst').strpath, downloader('test', []))
+    cache.fetch(c, 4, tmpdir.join('dst').strpath, downloader('test', []))
+
+    assert os.path.exists(cache.get_entry_path(a, 4))
+    assert not os.path.exists(cache.get_entry_path(b, 4))
+    assert os.path.exists(cache.get_entry_path(c, 4))
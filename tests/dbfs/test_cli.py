@@ -0,0 +1,252 @@
+# Databricks CLI
+# Copyright 2017 Databricks, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"), except
+# that the use of services to which certain application programming
+# interfaces (each, an "API") connect requires that the user first obtain
+# a license for the use of the APIs from Databricks, Inc. ("Databricks"),
+# by creating an account at www.databricks.com and agreeing to either (a)
+# the Community Edition Terms of Service, (b) the Databricks Terms of
+# Service, or (c) another written agreement between Licensee and Databricks
+# for the use of the APIs.
+#
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import os
+
+import mock
+import requests
+from click.testing import CliRunner
+
+import databricks_cli.dbfs.cli as cli
+from databricks_cli.dbfs.api import DbfsErrorCodes, FileInfo
+from databricks_cli.dbfs.manifest import Manifest
+from databricks_cli.dbfs.dbfs_path import DbfsPath
+from tests.utils import provide_conf
+
+TEST_DBFS_PATH = DbfsPath('dbfs:/test')
+
+
+def get_http_error(error_code):
+    response = requests.Response()
+    response._content = '{"error_code": "' + error_code + '"}' #  NOQA
+    return requests.exceptions.HTTPError(response=response)
+
+
+def make_tree(root, paths):
+    for path in paths:
+        path = os.path.join(root, path)
+        if path.endswith('/'):
+            os.makedirs(path)
+        else:
+            with open(path, 'w') as f:
+                f.write('test')
+
+
+def test_copy_to_dbfs_recursive(tmpdir):
+    make_tree(tmpdir.strpath, ['a', 'b/', 'b/c', 'b/d/', 'b/d/e', 'f'])
+    calls = []
+    with mock.patch('databricks_cli.dbfs.api.mkdirs') as mkdirs_mock, \
+            mock.patch('databricks_cli.dbfs.cli.put_file') as put_file_mock, \
+            mock.patch('databricks_cli.dbfs.cli.click.echo') as echo_mock:
+        mkdirs_mock.side_effect = lambda path: calls.append(('mkdirs', path.absolute_path))
+        put_file_mock.side_effect = lambda src, dst, overwrite: \
+            calls.append(('put_file', dst.absolute_path))
+        cli.copy_to_dbfs_recursive(tmpdir.strpath, TEST_DBFS_PATH, False, jobs=4)
+
+        mkdirs_calls = [c[1] for c in calls if c[0] == 'mkdirs']
+        put_file_calls = [c[1] for c in calls if c[0] == 'put_file']
+        assert mkdirs_calls == ['dbfs:/test/b/d']
+        assert calls[:len(mkdirs_calls)] == [('mkdirs', path) for path in mkdirs_calls]
+        assert sorted(put_file_calls) == \
+            ['dbfs:/test/a', 'dbfs:/test/b/c', 'dbfs:/test/b/d/e', 'dbfs:/test/f']
+        messages = [c[0][0] for c in echo_mock.call_args_list]
+        assert messages == ['{} -> {}'.format(os.path.join(tmpdir.strpath, src),
+                                              DbfsPath('dbfs:/test/' + src))
+                            for src in ['a', 'f', 'b/c', 'b/d/e']]
+
+
+def test_copy_to_dbfs_recursive_already_exists(tmpdir):
+    make_tree(tmpdir.strpath, ['a', 'b/', 'b/c'])
+    with mock.patch('databricks_cli.dbfs.api.mkdirs') as mkdirs_mock, \
+            mock.patch('databricks_cli.dbfs.cli.put_file') as put_file_mock, \
+            mock.patch('databricks_cli.dbfs.cli.click.echo') as echo_mock:
+        exception = get_http_error(DbfsErrorCodes.RESOURCE_ALREADY_EXISTS)
+
+        def mkdirs(dbfs_path):
+            if dbfs_path != TEST_DBFS_PATH:
+                raise exception
+
+        mkdirs_mock.side_effect = mkdirs
+        put_file_mock.side_effect = exception
+        cli.copy_to_dbfs_recursive(tmpdir.strpath, TEST_DBFS_PATH, False, jobs=2)
+
+        assert put_file_mock.call_count == 1
+        assert echo_mock.call_args[0][0] == \
+            '{} already exists. Skip.'.format(TEST_DBFS_PATH.join('a'))
+
+
+DBFS_TREE = {
+    'dbfs:/test': ['a', 'b/', 'f'],
+    'dbfs:/test/b': ['c', 'd/'],
+    'dbfs:/test/b/d': ['e'],
+}
+
+
+def list_dbfs_tree_files(dbfs_path):
+    return [FileInfo(dbfs_path.join(name.rstrip('/')), name.endswith('/'), 4)
+            for name in DBFS_TREE[dbfs_path.absolute_path]]
+
+
+def test_copy_from_dbfs_recursive(tmpdir):
+    with mock.patch('databricks_cli.dbfs.sync.list_files') as list_files_mock, \
+            mock.patch('databricks_cli.dbfs.cli.get_file') as get_file_mock, \
+            mock.patch('databricks_cli.dbfs.cli.click.echo') as echo_mock:
+        list_files_mock.side_effect = list_dbfs_tree_files
+        cli.copy_from_dbfs_recursive(TEST_DBFS_PATH, tmpdir.strpath, False, jobs=4)
+
+        assert sorted(c[0][0].absolute_path for c in list_files_mock.call_args_list) == \
+            ['dbfs:/test', 'dbfs:/test/b', 'dbfs:/test/b/d']
+        assert os.path.isdir(os.path.join(tmpdir.strpath, 'b', 'd'))
+        srcs = ['a', 'b/c', 'b/d/e', 'f']
+        assert sorted(c[0][0].absolute_path for c in get_file_mock.call_args_list) == \
+            ['dbfs:/test/' + src for src in srcs]
+        messages = [c[0][0] for c in echo_mock.call_args_list]
+        assert messages == ['{} -> {}'.format(DbfsPath('dbfs:/test/' + src),
+                                              os.path.join(tmpdir.strpath, *src.split('/')))
+                            for src in srcs]
+
+
+def test_copy_from_dbfs_recursive_skips_local_files(tmpdir):
+    make_tree(tmpdir.strpath, ['a', 'b'])
+    with mock.patch('databricks_cli.dbfs.sync.list_files') as list_files_mock, \
+            mock.patch('databricks_cli.dbfs.cli.get_file') as get_file_mock, \
+            mock.patch('databricks_cli.dbfs.cli.click.echo') as echo_mock:
+        list_files_mock.side_effect = list_dbfs_tree_files
+
+        def get_file(_src, dst, _overwrite, _streams):
+            if os.path.exists(dst):
+                raise cli.LocalFileExistsException()
+
+        get_file_mock.side_effect = get_file
+        cli.copy_from_dbfs_recursive(TEST_DBFS_PATH, tmpdir.strpath, False, jobs=2)
+
+        assert sorted(c[0][0].absolute_path for c in get_file_mock.call_args_list) == \
+            ['dbfs:/test/a', 'dbfs:/test/f']
+        messages = [c[0][0] for c in echo_mock.call_args_list]
+        assert messages[0] == '{} exists as a file. Skipping this subtree {}'.format(
+            os.path.join(tmpdir.strpath, 'b'), repr(DbfsPath('dbfs:/test/b')))
+        assert messages[1].startswith('{} already exists locally'.format(TEST_DBFS_PATH.join('a')))
+        assert len(messages) == 3
+
+
+def test_copy_to_dbfs_non_recursive_to_dir():
+    with mock.patch('databricks_cli.dbfs.cli.get_status') as get_status_mock, \
+            mock.patch('databricks_cli.dbfs.cli.put_file') as put_file_mock:
+        cli.copy_to_dbfs_non_recursive('/local/a', DbfsPath('dbfs:/test/'), False)
+        assert get_status_mock.call_count == 0
+        assert put_file_mock.call_args[0][1] == DbfsPath('dbfs:/test/a')
+
+
+def test_copy_to_dbfs_non_recursive_resume():
+    with mock.patch('databricks_cli.dbfs.cli.get_status'), \
+            mock.patch('databricks_cli.dbfs.cli.put_file') as put_file_mock, \
+            mock.patch('databricks_cli.dbfs.cli.put_file_resumable') as put_file_resumable_mock:
+        cli.copy_to_dbfs_non_recursive('/local/a', DbfsPath('dbfs:/test/'), False, resume=True)
+        assert put_file_mock.call_count == 0
+        put_file_resumable_mock.assert_called_once_with('/local/a', DbfsPath('dbfs:/test/a'), False)
+
+
+def test_copy_to_dbfs_recursive_with_manifest(tmpdir):
+    make_tree(tmpdir.strpath, ['a', 'b/', 'b/c'])
+    old_manifest = Manifest()
+    old_manifest.record('b/c', os.path.join(tmpdir.strpath, 'b', 'c'),
+                        hashlib.sha256('test').hexdigest())
+    with mock.patch('databricks_cli.dbfs.api.mkdirs'), \
+            mock.patch('databricks_cli.dbfs.cli.put_file') as put_file_mock, \
+            mock.patch('databricks_cli.dbfs.cli.list_dbfs_tree') as list_dbfs_tree_mock, \
+            mock.patch('databricks_cli.dbfs.cli.load_manifest') as load_manifest_mock, \
+            mock.patch('databricks_cli.dbfs.cli.save_manifest') as save_manifest_mock, \
+            mock.patch('databricks_cli.dbfs.cli.click.echo') as echo_mock:
+        list_dbfs_tree_mock.return_value = {'b/c': FileInfo(TEST_DBFS_PATH.join('b/c'), False, 4)}
+        load_manifest_mock.return_value = old_manifest
+        cli.copy_to_dbfs_recursive(tmpdir.strpath, TEST_DBFS_PATH, True, jobs=2, manifest=True)
+
+        put_file_mock.assert_called_once_with(os.path.join(tmpdir.strpath, 'a'),
+                                              TEST_DBFS_PATH.join('a'), True)
+        assert echo_mock.call_args_list[0][0][0] == \
+            '{} is unchanged. Skip.'.format(os.path.join(tmpdir.strpath, 'b', 'c'))
+        assert sorted(save_manifest_mock.call_args[0][1].files) == ['a', 'b/c']
+
+
+@provide_conf
+def test_cat_cli():
+    with mock.patch('databricks_cli.dbfs.cli.iter_file') as iter_file_mock:
+        iter_file_mock.return_value = iter(['a' * 10, 'b' * 5])
+        result = CliRunner().invoke(cli.cat_cli, ['dbfs:/test'])
+        assert result.exit_code == 0
+        assert result.output == 'a' * 10 + 'b' * 5
+        assert iter_file_mock.call_args[0][0] == TEST_DBFS_PATH
+
+
+@provide_conf
+def test_cat_cli_range():
+    with mock.patch('databricks_cli.dbfs.cli.iter_file') as iter_file_mock:
+        iter_file_mock.return_value = iter(['abc'])
+        result = CliRunner().invoke(cli.cat_cli, ['--offset', '-3', '--length', '2', 'dbfs:/test'])
+        assert result.exit_code == 0
+        assert iter_file_mock.call_args[0] == (TEST_DBFS_PATH, -3, 2)
+
+
+@provide_conf
+def test_head_and_tail_cli():
+    with mock.patch('databricks_cli.dbfs.cli.head_file') as head_file_mock, \
+            mock.patch('databricks_cli.dbfs.cli.tail_file') as tail_file_mock, \
+            mock.patch('databricks_cli.dbfs.cli.iter_file') as iter_file_mock:
+        head_file_mock.return_value = 'a\n'
+        tail_file_mock.return_value = 'z\n'
+        iter_file_mock.return_value = iter(['xyz'])
+        result = CliRunner().invoke(cli.head_cli, ['dbfs:/test'])
+        assert result.output == 'a\n'
+        head_file_mock.assert_called_once_with(TEST_DBFS_PATH, num_lines=10)
+        result = CliRunner().invoke(cli.tail_cli, ['-n', '5', 'dbfs:/test'])
+        assert result.output == 'z\n'
+        tail_file_mock.assert_called_once_with(TEST_DBFS_PATH, num_lines=5)
+        result = CliRunner().invoke(cli.tail_cli, ['-c', '3', 'dbfs:/test'])
+        assert result.output == 'xyz'
+        assert iter_file_mock.call_args[0] == (TEST_DBFS_PATH, -3)
+
+
+@provide_conf
+def test_cp_cli_cache_dir():
+    with mock.patch('databricks_cli.dbfs.cli.copy_from_dbfs_non_recursive') as copy_mock, \
+            mock.patch('databricks_cli.dbfs.cli.set_client_option') as set_client_option_mock:
+        result = CliRunner().invoke(cli.cp_cli, ['--cache-dir', '/cache', 'dbfs:/test', 'test'])
+        assert result.exit_code == 0
+        set_client_option_mock.assert_called_once_with('dbfs_cache_dir', '/cache')
+        assert copy_mock.call_count == 1
+
+
+@provide_conf
+def test_cp_cli_stdin():
+    uploaded = []
+    with mock.patch('databricks_cli.dbfs.cli.put_stream') as put_stream_mock:
+        put_stream_mock.side_effect = lambda source, dbfs_path, overwrite: \
+            uploaded.append((source.read(), dbfs_path, overwrite))
+        result = CliRunner().invoke(cli.cp_cli, ['--overwrite', '-', 'dbfs:/test'], input='abc')
+        assert result.exit_code == 0
+        assert uploaded == [('abc', TEST_DBFS_PATH, True)]
+
+        result = CliRunner().invoke(cli.cp_cli, ['-', 'dbfs:/test/'], input='abc')
+        assert result.exit_code != 0
+        assert len(uploaded) == 1
@@ -0,0 +1,101 @@
+# Databricks CLI
+# Copyright 2017 Databricks, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"), except
+# that the use of services to which certain application programming
+# interfaces (each, an "API") connect requires that the user first obtain
+# a license for the use of the APIs from Databricks, Inc. ("Databricks"),
+# by creating an account at www.databricks.com and agreeing to either (a)
+# the Community Edition Terms of Service, (b) the Databricks Terms of
+# Service, or (c) another written agreement between Licensee and Databricks
+# for the use of the APIs.
+#
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import hashlib
+import json
+import os
+
+import mock
+import requests
+
+import databricks_cli.dbfs.manifest as manifest
+from databricks_cli.dbfs.api import DbfsErrorCodes
+from databricks_cli.dbfs.dbfs_path import DbfsPath
+
+TEST_DBFS_PATH = DbfsPath('dbfs:/test')
+
+
+def test_hash_local_files(tmpdir):
+    paths = []
+    for i in range(5):
+        paths.append(os.path.join(tmpdir.strpath, str(i)))
+        with open(paths[-1], 'w') as f:
+            f.write(str(i) * 1000)
+    assert manifest.hash_local_files(paths, jobs=3) == \
+        [hashlib.sha256(str(i) * 1000).hexdigest() for i in range(5)]
+
+
+class TestManifest(object):
+    def test_record(self, tmpdir):
+        path = os.path.join(tmpdir.strpath, 'a')
+        with open(path, 'w') as f:
+            f.write('abc')
+        test_manifest = manifest.Manifest()
+        test_manifest.record('dir/a', path, 'digest')
+
+        assert test_manifest.is_unchanged('dir/a', 3, 'digest')
+        assert not test_manifest.is_unchanged('dir/a', 3, 'other')
+        assert not test_manifest.is_unchanged('dir/a', 4, 'digest')
+        assert not test_manifest.is_unchanged('a', 3, 'digest')
+        assert test_manifest.files['dir/a']['mtime'] == os.stat(path).st_mtime
+
+    def test_remove(self):
+        entry = {'size': 1, 'mtime': 0, 'sha256': 'digest'}
+        test_manifest = manifest.Manifest({'a': entry, 'a/b': entry, 'ab': entry})
+        test_manifest.remove('a')
+        assert test_manifest.files == {'ab': entry}
+
+    def test_json(self):
+        files = {'a': {'size': 1, 'mtime': 2.5, 'sha256': 'digest'}}
+        assert manifest.Manifest.from_json(manifest.Manifest(files).to_json()).files == files
+        assert manifest.Manifest.from_json(json.dumps({'version': 0, 'files': files})).files == {}
+
+
+def test_load_manifest():
+    with mock.patch('databricks_cli.dbfs.manifest.read_file') as read_file_mock:
+        read_file_mock.return_value = manifest.Manifest({'a': {}}).to_json()
+        assert manifest.load_manifest(TEST_DBFS_PATH).files == {'a': {}}
+        read_file_mock.assert_called_once_with(TEST_DBFS_PATH.join(manifest.MANIFEST_NAME))
+
+        read_file_mock.return_value = 'not json'
+        assert manifest.load_manifest(TEST_DBFS_PATH).files == {}
+
+        response = requests.Response()
+        response._content = json.dumps({'error_code': DbfsErrorCodes.RESOURCE_DOES_NOT_EXIST})
+        read_file_mock.side_effect = requests.exceptions.HTTPError(response=response)
+        assert manifest.load_manifest(TEST_DBFS_PATH).files == {}
+
+
+def test_save_manifest():
+    saved = []
+
+    def put_file(src_path, dbfs_path, overwrite):
+        with open(src_path) as f:
+            saved.append((json.load(f), dbfs_path, overwrite))
+
+    with mock.patch('databricks_cli.dbfs.manifest.put_file') as put_file_mock:
+        put_file_mock.side_effect = put_file
+        manifest.save_manifest(TEST_DBFS_PATH, manifest.Manifest({'a': {}}))
+    assert saved == [({'version': manifest.MANIFEST_VERSION, 'files': {'a': {}}},
+                      TEST_DBFS_PATH.join(manifest.MANIFEST_NAME), True)]
@@ -0,0 +1,183 @@
+# Databricks CLI
+# Copyright 2017 Databricks, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"), except
+# that the use of services to which certain application programming
+# interfaces (each, an "API") connect requires that the user first obtain
+# a license for the use of the APIs from Databricks, Inc. ("Databricks"),
+# by creating an account at www.databricks.com and agreeing to either (a)
+# the Community Edition Terms of Service, (b) the Databricks Terms of
+# Service, or (c) another written agreement between Licensee and Databricks
+# for the use of the APIs.
+#
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import hashlib
+import ntpath
+import os
+
+import mock
+import requests
+
+import databricks_cli.dbfs.sync as sync
+from databricks_cli.dbfs.api import FileInfo, DbfsErrorCodes
+from databricks_cli.dbfs.dbfs_path import DbfsPath
+
+TEST_DBFS_PATH = DbfsPath('dbfs:/test')
+
+
+def make_tree(root, files):
+    for path, contents in sorted(files.items()):
+        path = os.path.join(root, path)
+        if contents is None:
+            os.makedirs(path)
+        else:
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path, 'w') as f:
+                f.write(contents)
+
+
+def dbfs_tree(entries):
+    return {relpath: FileInfo(TEST_DBFS_PATH.join(relpath), size is None, size)
+            for relpath, size in entries.items()}
+
+
+def test_list_local_tree(tmpdir):
+    make_tree(tmpdir.strpath, {'a': 'x', 'b': None, 'b/c': 'xyz', 'd': None})
+    assert sync.list_local_tree(tmpdir.strpath) == {'a': 1, 'b': None, 'b/c': 3, 'd': None}
+
+
+def test_list_dbfs_tree():
+    listings = {
+        'dbfs:/test': [FileInfo(DbfsPath('dbfs:/test/a'), False, 1),
+                       FileInfo(DbfsPath('dbfs:/test/b'), True, 0)],
+        'dbfs:/test/b': [FileInfo(DbfsPath('dbfs:/test/b/c'), False, 3)],
+    }
+    with mock.patch('databricks_cli.dbfs.sync.list_files') as list_files_mock:
+        list_files_mock.side_effect = lambda path: listings[path.absolute_path]
+        tree = sync.list_dbfs_tree(TEST_DBFS_PATH, jobs=2)
+    assert sorted(tree) == ['a', 'b', 'b/c']
+    assert tree['b/c'].file_size == 3
+
+
+def test_list_dbfs_tree_windows():
+    listings = {
+        'dbfs:/': [FileInfo(DbfsPath('dbfs:/b'), True, 0)],
+        'dbfs:/b': [FileInfo(DbfsPath('dbfs:/b/c'), False, 3)],
+    }
+    # Keys use / separators even where os.path.relpath returns backslashes.
+    with mock.patch('databricks_cli.dbfs.sync.list_files') as list_files_mock, \
+            mock.patch.object(DbfsPath, 'relpath',
+                              lambda self, prefix: ntpath.relpath(self.absolute_path,
+                                                                  prefix.absolute_path)):
+        list_files_mock.side_effect = lambda path: listings[path.absolute_path]
+        assert sorted(sync.list_dbfs_tree(DbfsPath('dbfs:/'))) == ['b', 'b/c']
+
+
+def test_list_dbfs_tree_does_not_exist():
+    response = requests.Response()
+    response._content = '{"error_code": "' + DbfsErrorCodes.RESOURCE_DOES_NOT_EXIST + '"}' #  NOQA
+    with mock.patch('databricks_cli.dbfs.sync.list_files') as list_files_mock:
+        list_files_mock.side_effect = requests.exceptions.HTTPError(response=response)
+        assert sync.list_dbfs_tree(TEST_DBFS_PATH) == {}
+
+
+class TestPlanSync(object):
+    local = {'same': 1, 'changed': 2, 'new': 3, 'dir': None, 'dir/new': 1, 'kind': 1}
+    remote = {'same': 1, 'changed': 5, 'dir': None, 'extra': None, 'extra/a': 1, 'kind': None,
+              'kind/a': 1}
+
+    def test_plan(self):
+        plan = sync.plan_sync(self.local, dbfs_tree(self.remote), False)
+        assert plan.deletes == []
+        assert plan.mkdirs == []
+        assert plan.uploads == ['changed', 'dir/new', 'new']
+        assert plan.candidates == ['same']
+        assert plan.conflicts == ['kind']
+
+    def test_plan_delete_extra(self):
+        plan = sync.plan_sync(self.local, dbfs_tree(self.remote), True)
+        assert plan.deletes == [TEST_DBFS_PATH.join('extra'), TEST_DBFS_PATH.join('kind')]
+        assert plan.uploads == ['changed', 'dir/new', 'kind', 'new']
+        assert plan.conflicts == []
+
+    def test_plan_new_directories(self):
+        plan = sync.plan_sync({'a': None, 'a/b': None, 'a/b/c': 1}, {}, False)
+        assert plan.mkdirs == ['a', 'a/b']
+        assert plan.uploads == ['a/b/c']
+
+
+def test_sync(tmpdir):
+    make_tree(tmpdir.strpath, {'same': 'x', 'edited': 'y', 'new': 'z'})
+    remote = dbfs_tree({'same': 1, 'edited': 1, 'extra': 1})
+    contents = {'same': 'x', 'edited': 'n'}
+    with mock.patch('databricks_cli.dbfs.sync.list_dbfs_tree') as list_dbfs_tree_mock, \
+            mock.patch('databricks_cli.dbfs.sync.hash_file') as hash_file_mock, \
+            mock.patch('databricks_cli.dbfs.sync.put_file') as put_file_mock, \
+            mock.patch('databricks_cli.dbfs.sync.delete') as delete_mock, \
+            mock.patch('databricks_cli.dbfs.sync.mkdirs_leaves') as mkdirs_mock:
+        list_dbfs_tree_mock.return_value = remote
+        hash_file_mock.side_effect = lambda path, size: \
+            hashlib.sha256(contents[path.basename]).hexdigest()
+        messages = []
+        sync.sync(tmpdir.strpath, TEST_DBFS_PATH, delete_extra=True, checksum=True, jobs=2,
+                  echo=messages.append)
+
+        assert mkdirs_mock.call_count == 0
+        delete_mock.assert_called_once_with(TEST_DBFS_PATH.join('extra'), True)
+        assert sorted(c[0][1].basename for c in put_file_mock.call_args_list) == ['edited', 'new']
+        assert messages == [
+            'Deleted {}'.format(TEST_DBFS_PATH.join('extra')),
+            '{} -> {}'.format(os.path.join(tmpdir.strpath, 'new'), TEST_DBFS_PATH.join('new')),
+            '{} -> {}'.format(os.path.join(tmpdir.strpath, 'edited'),
+                              TEST_DBFS_PATH.join('edited')),
+        ]
+
+
+def test_sync_without_checksum(tmpdir):
+    make_tree(tmpdir.strpath, {'same': 'x'})
+    with mock.patch('databricks_cli.dbfs.sync.list_dbfs_tree') as list_dbfs_tree_mock, \
+            mock.patch('databricks_cli.dbfs.sync.hash_file') as hash_file_mock, \
+            mock.patch('databricks_cli.dbfs.sync.put_file') as put_file_mock:
+        list_dbfs_tree_mock.return_value = dbfs_tree({'same': 1})
+        sync.sync(tmpdir.strpath, TEST_DBFS_PATH)
+        assert hash_file_mock.call_count == 0
+        assert put_file_mock.call_count == 0
+
+
+def test_sync_with_manifest(tmpdir):
+    make_tree(tmpdir.strpath, {'same': 'x', 'edited': 'y', 'unknown': 'z', 'new': 'new'})
+    remote = dbfs_tree({'same': 1, 'edited': 1, 'unknown': 1, sync.MANIFEST_NAME: 100})
+    old_manifest = sync.Manifest()
+    old_manifest.record('same', os.path.join(tmpdir.strpath, 'same'),
+                        hashlib.sha256('x').hexdigest())
+    old_manifest.files['edited'] = {'size': 1, 'mtime': 0,
+                                    'sha256': hashlib.sha256('n').hexdigest()}
+    with mock.patch('databricks_cli.dbfs.sync.list_dbfs_tree') as list_dbfs_tree_mock, \
+            mock.patch('databricks_cli.dbfs.sync.load_manifest') as load_manifest_mock, \
+            mock.patch('databricks_cli.dbfs.sync.save_manifest') as save_manifest_mock, \
+            mock.patch('databricks_cli.dbfs.sync.hash_file') as hash_file_mock, \
+            mock.patch('databricks_cli.dbfs.sync.put_file') as put_file_mock, \
+            mock.patch('databricks_cli.dbfs.sync.delete') as delete_mock, \
+            mock.patch('databricks_cli.dbfs.sync.mkdirs_leaves'):
+        list_dbfs_tree_mock.return_value = remote
+        load_manifest_mock.return_value = old_manifest
+        sync.sync(tmpdir.strpath, TEST_DBFS_PATH, delete_extra=True, manifest=True)
+
+        assert hash_file_mock.call_count == 0
+        assert delete_mock.call_count == 0
+        assert sorted(c[0][1].basename for c in put_file_mock.call_args_list) == ['edited', 'new']
+        new_manifest = save_manifest_mock.call_args[0][1]
+        assert sorted(new_manifest.files) == ['edited', 'new', 'same']
+        assert new_manifest.is_unchanged('edited', 1, hashlib.sha256('y').hexdigest())
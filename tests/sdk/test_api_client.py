@@ -0,0 +1,265 @@
+# Databricks CLI
+# Copyright 2017 Databricks, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"), except
+# that the use of services to which certain application programming
+# interfaces (each, an "API") connect requires that the user first obtain
+# a license for the use of the APIs from Databricks, Inc. ("Databricks"),
+# by creating an account at www.databricks.com and agreeing to either (a)
+# the Community Edition Terms of Service, (b) the Databricks Terms of
+# Service, or (c) another written agreement between Licensee and Databricks
+# for the use of the APIs.
+#
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gzip
+import json
+import threading
+import zlib
+from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+from StringIO import StringIO
+
+import mock
+import pytest
+import requests
+
+from databricks_cli.sdk import JobsService, ResponseCache
+from databricks_cli.sdk.api_client import ApiClient, AsyncApiClient, CallRecorder
+from databricks_cli.sdk.retry import RetryPolicy
+
+TEST_HOST = 'https://test-host'
+
+
+def test_pool_settings():
+    client = ApiClient(host=TEST_HOST, token='test-token', pool_maxsize=32, pool_block=True,
+                       pool_idle_timeout=5)
+    adapter = client.session.get_adapter(TEST_HOST)
+    assert adapter.idle_timeout == 5
+    assert adapter.poolmanager.connection_pool_kw['maxsize'] == 32
+    assert adapter.poolmanager.connection_pool_kw['block']
+
+
+def test_idle_pool_is_cleared():
+    client = ApiClient(host=TEST_HOST, token='test-token', pool_idle_timeout=5)
+    adapter = client.session.get_adapter(TEST_HOST)
+    with mock.patch('requests.adapters.HTTPAdapter.send') as send_mock:
+        with mock.patch.object(adapter.poolmanager, 'clear') as clear_mock:
+            adapter._last_used -= 1
+            adapter.send(mock.Mock())
+            assert clear_mock.call_count == 0
+            adapter._last_used -= 10
+            adapter.send(mock.Mock())
+            assert clear_mock.call_count == 1
+            assert send_mock.call_count == 2
+
+
+def test_close():
+    client = ApiClient(host=TEST_HOST, token='test-token')
+    with mock.patch.object(client.session, 'close') as close_mock:
+        client.close()
+        assert close_mock.call_count == 1
+
+
+def get_response(status_code, content='{}', headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    response.headers.update(headers or {})
+    return response
+
+
+def test_perform_query_retries():
+    client = ApiClient(host=TEST_HOST, token='test-token',
+                       retry_policy=RetryPolicy(max_attempts=3, jitter=False))
+    responses = [get_response(503, headers={'Retry-After': '2'}), get_response(429),
+                 get_response(200, '{"bytes_read": 1}')]
+    with mock.patch.object(client.session, 'request', side_effect=responses) as request_mock:
+        with mock.patch('time.sleep') as sleep_mock:
+            assert client.perform_query('GET', '/dbfs/read') == {'bytes_read': 1}
+            assert request_mock.call_count == 3
+            assert [c[0][0] for c in sleep_mock.call_args_list] == [2, 1]
+
+
+def test_perform_query_gives_up():
+    client = ApiClient(host=TEST_HOST, token='test-token',
+                       retry_policy=RetryPolicy(max_attempts=2))
+    with mock.patch.object(client.session, 'request') as request_mock:
+        request_mock.return_value = get_response(500)
+        with mock.patch('time.sleep'):
+            with pytest.raises(requests.exceptions.HTTPError):
+                client.perform_query('GET', '/jobs/get')
+            assert request_mock.call_count == 2
+            request_mock.reset_mock()
+            with pytest.raises(requests.exceptions.HTTPError):
+                client.perform_query('POST', '/jobs/create')
+            assert request_mock.call_count == 1
+
+
+def test_perform_query_rate_limited():
+    rate_limiter = mock.Mock()
+    client = ApiClient(host=TEST_HOST, token='test-token', rate_limiter=rate_limiter)
+    with mock.patch.object(client.session, 'request') as request_mock:
+        request_mock.return_value = get_response(200)
+        client.perform_query('GET', '/jobs/get')
+        rate_limiter.acquire.assert_called_once_with('/jobs/get')
+
+
+def test_async_api_client():
+    client = ApiClient(host=TEST_HOST, token='test-token')
+    async_client = AsyncApiClient(client, max_workers=4)
+    jobs = JobsService(async_client)
+    with mock.patch.object(client, 'perform_query') as perform_query_mock:
+        perform_query_mock.side_effect = lambda method, path, data, headers: data
+        results = [jobs.get_job(job_id) for job_id in range(10)]
+        assert [result.get(timeout=10) for result in results] == \
+            [{'job_id': job_id} for job_id in range(10)]
+    async_client.close()
+
+
+def test_async_api_client_error():
+    client = ApiClient(host=TEST_HOST, token='test-token')
+    async_client = AsyncApiClient(client)
+    assert async_client.max_workers == client.pool_maxsize
+    with mock.patch.object(client, 'perform_query') as perform_query_mock:
+        perform_query_mock.side_effect = requests.exceptions.HTTPError()
+        result = async_client.perform_query('GET', '/jobs/get')
+        with pytest.raises(requests.exceptions.HTTPError):
+            result.get(timeout=10)
+    async_client.close()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Answers every POST with a JSON description of the request it received, gzipped when the
+    client accepts it.
+    """
+    def do_POST(self): #  NOQA
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        content_encoding = self.headers.get('Content-Encoding')
+        if content_encoding == 'gzip':
+            body = zlib.decompress(body, 16 + zlib.MAX_WBITS)
+        response = json.dumps({
+            'path': self.path,
+            'content_encoding': content_encoding,
+            'data': json.loads(body),
+        })
+        self.send_response(200)
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            compressed = StringIO()
+            with gzip.GzipFile(fileobj=compressed, mode='wb') as f:
+                f.write(response)
+            response = compressed.getvalue()
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, *args): #  NOQA
+        pass
+
+
+@pytest.fixture()
+def stand_in_host():
+    server = HTTPServer(('127.0.0.1', 0), StandInHandler)
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,))
+    thread.daemon = True
+    thread.start()
+    yield 'http://127.0.0.1:{}'.format(server.server_port)
+    server.shutdown()
+    server.server_close()
+
+
+def test_compressed_requests_and_responses(stand_in_host):
+    client = ApiClient(host=stand_in_host, token='test-token',
+                       compress_request_paths=['/dbfs/add-block'], compress_min_bytes=100)
+    with mock.patch.object(client.session, 'request', wraps=client.session.request) as request_mock:
+        data = {'handle': 1, 'data': 'x' * 1000}
+        response = client.perform_query('POST', '/dbfs/add-block', data)
+        assert response == {'path': '/api/2.0/dbfs/add-block', 'content_encoding': 'gzip',
+                            'data': data}
+        assert len(request_mock.call_args[1]['data']) < 100
+        assert client.perform_query('POST', '/dbfs/add-block', {'handle': 1}) == \
+            {'path': '/api/2.0/dbfs/add-block', 'content_encoding': None, 'data': {'handle': 1}}
+        assert client.perform_query('POST', '/jobs/create', data)['content_encoding'] is None
+
+
+def test_serialized_body(stand_in_host):
+    client = ApiClient(host=stand_in_host, token='test-token',
+                       compress_request_paths=['/dbfs/add-block'], compress_min_bytes=10)
+    body = memoryview(bytearray('{"handle": 1, "data": "eHh4"} and unused space'))[:29]
+    response = client.perform_query('POST', '/dbfs/add-block', body)
+    assert response == {'path': '/api/2.0/dbfs/add-block', 'content_encoding': 'gzip',
+                        'data': {'handle': 1, 'data': 'eHh4'}}
+    response = client.perform_query('POST', '/dbfs/close', bytearray('{"handle": 1}'))
+    assert response['data'] == {'handle': 1}
+
+
+def test_uncompressed_responses(stand_in_host):
+    client = ApiClient(host=stand_in_host, token='test-token',
+                       uncompressed_response_paths=['/dbfs/'])
+    with mock.patch.object(client.session, 'request', wraps=client.session.request) as request_mock:
+        client.perform_query('POST', '/dbfs/read', {'path': '/a'})
+        assert request_mock.call_args[1]['headers']['Accept-Encoding'] == 'identity'
+        assert client.perform_query('POST', '/jobs/list', {})['path'] == '/api/2.0/jobs/list'
+        assert request_mock.call_args[1]['headers']['Accept-Encoding'] == 'gzip, deflate'
+
+
+def test_perform_query_cached():
+    client = ApiClient(host=TEST_HOST, token='test-token', cache=ResponseCache())
+    with mock.patch.object(client.session, 'request') as request_mock:
+        request_mock.return_value = get_response(200, '{"versions": []}')
+        for _ in range(3):
+            assert client.perform_query('GET', '/clusters/spark-versions') == {'versions': []}
+        assert request_mock.call_count == 1
+        client.perform_query('GET', '/clusters/get', {'cluster_id': 'test'})
+        client.perform_query('GET', '/clusters/get', {'cluster_id': 'test'})
+        assert request_mock.call_count == 3
+
+
+def test_hooks():
+    hook = mock.Mock()
+    client = ApiClient(host=TEST_HOST, token='test-token', hooks=[hook],
+                       retry_policy=RetryPolicy(max_attempts=2, jitter=False))
+    responses = [get_response(503), get_response(200, '{"job_id": 1}')]
+    with mock.patch.object(client.session, 'request', side_effect=responses):
+        with mock.patch('time.sleep'):
+            client.perform_query('GET', '/jobs/get', {'job_id': 1})
+    assert [c[0] for c in hook.method_calls] == \
+        ['on_request', 'on_error', 'on_retry', 'on_request', 'on_response']
+    assert hook.on_request.call_args[0] == ('GET', '/jobs/get', len('{"job_id": 1}'))
+    assert hook.on_retry.call_args[0][2:4] == (1, 0.5)
+    stats = client.stats.snapshot()['/jobs/get']
+    assert stats['requests'] == 2
+    assert stats['errors'] == 1
+    assert stats['retries'] == 1
+    assert stats['bytes_received'] == len('{"job_id": 1}')
+
+
+def test_perform_batch():
+    client = ApiClient(host=TEST_HOST, token='test-token')
+    jobs = JobsService(CallRecorder())
+    calls = [jobs.get_job(job_id) for job_id in range(20)]
+    assert calls[3] == ('GET', '/jobs/get', {'job_id': 3})
+    error = requests.exceptions.HTTPError()
+
+    def perform_query(method, path, data):
+        if data['job_id'] == 5:
+            raise error
+        return {'job_id': data['job_id']}
+
+    with mock.patch.object(client, 'perform_query', side_effect=perform_query):
+        results = client.perform_batch(calls, max_workers=4)
+    assert [result.response for result in results] == \
+        [None if job_id == 5 else {'job_id': job_id} for job_id in range(20)]
+    assert results[5].error is error
+    assert all(result.error is None for i, result in enumerate(results) if i != 5)
+    assert client.perform_batch([]) == []
@@ -0,0 +1,96 @@
+# Databricks CLI
+# Copyright 2017 Databricks, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"), except
+# that the use of services to which certain application programming
+# interfaces (each, an "API") connect requires that the user first obtain
+# a license for the use of the APIs from Databricks, Inc. ("Databricks"),
+# by creating an account at www.databricks.com and agreeing to either (a)
+# the Community Edition Terms of Service, (b) the Databricks Terms of
+# Service, or (c) another written agreement between Licensee and Databricks
+# for the use of the APIs.
+#
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+
+import mock
+
+from databricks_cli.sdk.cache import ResponseCache, parse_ttls
+
+TEST_KEY = ResponseCache.get_key(['https://test-host', 'user'], 'GET', '/workspace/list',
+                                 {'path': '/'})
+TEST_RESPONSE = {'objects': [{'path': '/a', 'object_type': 'DIRECTORY'}]}
+
+
+def test_get_key():
+    assert TEST_KEY == ResponseCache.get_key(['https://test-host', 'user'], 'GET',
+                                             '/workspace/list', {'path': '/'})
+    assert TEST_KEY != ResponseCache.get_key(['https://test-host', 'other-user'], 'GET',
+                                             '/workspace/list', {'path': '/'})
+    assert TEST_KEY != ResponseCache.get_key(['https://test-host', 'user'], 'GET',
+                                             '/workspace/list', {'path': '/b'})
+
+
+def test_memory_cache_expires():
+    cache = ResponseCache()
+    assert cache.get(TEST_KEY) is None
+    with mock.patch('time.time') as time_mock:
+        time_mock.return_value = 1000
+        cache.put(TEST_KEY, TEST_RESPONSE, 60)
+        assert cache.get(TEST_KEY) == TEST_RESPONSE
+        assert cache.get(TEST_KEY) is not cache.get(TEST_KEY)
+        time_mock.return_value = 1061
+        assert cache.get(TEST_KEY) is None
+
+
+def test_memory_cache_lru():
+    cache = ResponseCache(max_entries=2)
+    for key in ['a', 'b']:
+        cache.put(key, {}, 60)
+    cache.get('a')
+    cache.put('c', {}, 60)
+    assert cache.get('a') == {}
+    assert cache.get('b') is None
+
+
+def test_disk_cache_shared(tmpdir):
+    ResponseCache(cache_dir=tmpdir.strpath).put(TEST_KEY, TEST_RESPONSE, 60)
+    assert ResponseCache(cache_dir=tmpdir.strpath).get(TEST_KEY) == TEST_RESPONSE
+    assert ResponseCache().get(TEST_KEY) is None
+
+
+def test_disk_cache_eviction(tmpdir):
+    cache = ResponseCache(cache_dir=tmpdir.strpath, max_disk_bytes=300)
+    for i, key in enumerate(['a', 'b', 'c']):
+        cache.put(key, {'data': 'x' * 50}, 60)
+        os.utime(os.path.join(tmpdir.strpath, key + '.json'), (i, i))
+    cache.put('d', {'data': 'x' * 50}, 60)
+    assert sorted(os.listdir(tmpdir.strpath)) == ['b.json', 'c.json', 'd.json']
+    cache.clear()
+    assert os.listdir(tmpdir.strpath) == []
+
+
+def test_disk_cache_unwritable(tmpdir):
+    # A file is in the way of the cache directory.
+    tmpdir.join('file').write('')
+    cache = ResponseCache(cache_dir=tmpdir.join('file', 'cache').strpath)
+    cache.put(TEST_KEY, TEST_RESPONSE, 60)
+    assert cache.get(TEST_KEY) == TEST_RESPONSE
+    assert os.listdir(tmpdir.strpath) == ['file']
+
+
+def test_parse_ttls():
+    assert parse_ttls('/workspace/list=60, /clusters/list-zones=3600') == {
+        '/workspace/list': 60,
+        '/clusters/list-zones': 3600,
+    }
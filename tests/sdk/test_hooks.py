@@ -0,0 +1,62 @@
+# Databricks CLI
+# Copyright 2017 Databricks, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"), except
+# that the use of services to which certain application programming
+# interfaces (each, an "API") connect requires that the user first obtain
+# a license for the use of the APIs from Databricks, Inc. ("Databricks"),
+# by creating an account at www.databricks.com and agreeing to either (a)
+# the Community Edition Terms of Service, (b) the Databricks Terms of
+# Service, or (c) another written agreement between Licensee and Databricks
+# for the use of the APIs.
+#
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import requests
+
+from databricks_cli.sdk.hooks import RequestStats, LATENCY_BUCKETS
+
+
+def test_request_stats():
+    stats = RequestStats()
+    response = requests.Response()
+    response._content = '{"a": 1}'
+    stats.on_request('GET', '/jobs/get', 10)
+    stats.on_response('GET', '/jobs/get', response, 0.02)
+    stats.on_request('GET', '/jobs/get', 10)
+    stats.on_error('GET', '/jobs/get', requests.exceptions.ConnectionError(), 3)
+    stats.on_retry('GET', '/jobs/get', 1, 0.5, requests.exceptions.ConnectionError())
+    snapshot = stats.snapshot()['/jobs/get']
+    assert snapshot['requests'] == 2
+    assert snapshot['errors'] == 1
+    assert snapshot['retries'] == 1
+    assert snapshot['bytes_sent'] == 20
+    assert snapshot['bytes_received'] == 8
+    assert snapshot['total_latency'] == 3.02
+    histogram = dict(snapshot['latency_histogram'])
+    assert histogram[0.025] == 1
+    assert histogram[5.0] == 1
+    assert sum(histogram.values()) == 2
+    assert len(histogram) == len(LATENCY_BUCKETS)
+    stats.reset()
+    assert stats.snapshot() == {}
+
+
+
+def test_request_stats_counts_compressed_bytes():
+    stats = RequestStats()
+    response = requests.Response()
+    response._content = '{"a": 1}' * 100
+    response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Content-Length'] = '30'
+    stats.on_response('GET', '/jobs/get', response, 0.02)
+    assert stats.snapshot()['/jobs/get']['bytes_received'] == 30
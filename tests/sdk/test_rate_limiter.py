@@ -0,0 +1,73 @@
+# Databricks CLI
+# Copyright 2017 Databricks, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"), except
+# that the use of services to which certain application programming
+# interfaces (each, an "API") connect requires that the user first obtain
+# a license for the use of the APIs from Databricks, Inc. ("Databricks"),
+# by creating an account at www.databricks.com and agreeing to either (a)
+# the Community Edition Terms of Service, (b) the Databricks Terms of
+# Service, or (c) another written agreement between Licensee and Databricks
+# for the use of the APIs.
+#
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import mock
+
+from databricks_cli.sdk.rate_limiter import TokenBucket, RateLimiter, parse_endpoint_limits
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_token_bucket_burst_then_rate():
+    clock = FakeClock()
+    with mock.patch('time.time', clock.time), mock.patch('time.sleep', clock.sleep):
+        bucket = TokenBucket(rate=2, burst=3)
+        for _ in range(3):
+            bucket.acquire()
+        assert clock.sleeps == []
+        bucket.acquire()
+        bucket.acquire()
+        assert clock.sleeps == [0.5, 0.5]
+
+
+def test_rate_limiter_endpoint_limits():
+    limiter = RateLimiter(rate=100, endpoint_limits={'/dbfs/': (10, None),
+                                                     '/dbfs/read': (50, 5)})
+    with mock.patch.object(TokenBucket, 'acquire', autospec=True) as acquire_mock:
+        limiter.acquire('/dbfs/read')
+        assert [c[0][0].rate for c in acquire_mock.call_args_list] == [50, 100]
+        acquire_mock.reset_mock()
+        limiter.acquire('/dbfs/add-block')
+        assert [c[0][0].rate for c in acquire_mock.call_args_list] == [10, 100]
+        acquire_mock.reset_mock()
+        limiter.acquire('/jobs/get')
+        assert [c[0][0].rate for c in acquire_mock.call_args_list] == [100]
+
+
+def test_parse_endpoint_limits():
+    assert parse_endpoint_limits('/dbfs/=20:40, /jobs/=5') == {
+        '/dbfs/': (20.0, 40.0),
+        '/jobs/': (5.0, None),
+    }
+    assert parse_endpoint_limits('') == {}
@@ -0,0 +1,75 @@
+# Databricks CLI
+# Copyright 2017 Databricks, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"), except
+# that the use of services to which certain application programming
+# interfaces (each, an "API") connect requires that the user first obtain
+# a license for the use of the APIs from Databricks, Inc. ("Databricks"),
+# by creating an account at www.databricks.com and agreeing to either (a)
+# the Community Edition Terms of Service, (b) the Databricks Terms of
+# Service, or (c) another written agreement between Licensee and Databricks
+# for the use of the APIs.
+#
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import mock
+import requests
+
+from databricks_cli.sdk.retry import RetryPolicy, parse_retry_after
+
+
+def get_http_error(status_code, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    return requests.exceptions.HTTPError(response=response)
+
+
+def test_should_retry_idempotent():
+    policy = RetryPolicy(max_attempts=3)
+    assert policy.should_retry(1, 'GET', '/dbfs/read', get_http_error(500))
+    assert policy.should_retry(1, 'GET', '/jobs/get', requests.exceptions.ConnectionError())
+    assert policy.should_retry(1, 'POST', '/dbfs/mkdirs', get_http_error(502))
+    assert not policy.should_retry(1, 'GET', '/dbfs/read', get_http_error(404))
+    assert not policy.should_retry(3, 'GET', '/dbfs/read', get_http_error(500))
+
+
+def test_should_retry_not_idempotent():
+    policy = RetryPolicy(max_attempts=3)
+    assert policy.should_retry(1, 'POST', '/dbfs/add-block', get_http_error(429))
+    assert policy.should_retry(1, 'POST', '/jobs/create', requests.exceptions.ConnectTimeout())
+    assert not policy.should_retry(1, 'POST', '/dbfs/add-block', get_http_error(500))
+    assert not policy.should_retry(1, 'POST', '/dbfs/add-block', get_http_error(503))
+    assert not policy.should_retry(1, 'POST', '/jobs/run-now', get_http_error(503))
+    assert not policy.should_retry(1, 'POST', '/jobs/create',
+                                   requests.exceptions.ConnectionError())
+
+
+def test_get_backoff():
+    policy = RetryPolicy(backoff_base=1, backoff_cap=5, jitter=False)
+    assert [policy.get_backoff(attempt) for attempt in range(1, 6)] == [1, 2, 4, 5, 5]
+    jittered_policy = RetryPolicy(backoff_base=1, backoff_cap=5)
+    assert all(0 <= jittered_policy.get_backoff(4) <= 5 for _ in range(100))
+
+
+def test_get_backoff_retry_after():
+    policy = RetryPolicy(backoff_base=1, jitter=False)
+    response = get_http_error(429, {'Retry-After': '7'}).response
+    assert policy.get_backoff(1, response) == 7
+
+
+def test_parse_retry_after_date():
+    response = get_http_error(503, {'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'}).response
+    with mock.patch('time.time') as time_mock:
+        time_mock.return_value = 1445412470
+        assert parse_retry_after(response) == 10
+    assert parse_retry_after(get_http_error(503).response) is None
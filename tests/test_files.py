@@ -0,0 +1,81 @@
+# Databricks CLI
+# Copyright 2017 Databricks, Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"), except
+# that the use of services to which certain application programming
+# interfaces (each, an "API") connect requires that the user first obtain
+# a license for the use of the APIs from Databricks, Inc. ("Databricks"),
+# by creating an account at www.databricks.com and agreeing to either (a)
+# the Community Edition Terms of Service, (b) the Databricks Terms of
+# Service, or (c) another written agreement between Licensee and Databricks
+# for the use of the APIs.
+#
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import os
+
+import mock
+
+from databricks_cli.files import make_dirs, replace_file, remove_file, stat_files, \
+    evict_least_recently_used
+
+
+def rename_without_replacing(src_path, dst_path):
+    # Windows does not rename over an existing file.
+    if os.path.exists(dst_path):
+        raise OSError('{} exists'.format(dst_path))
+    os.link(src_path, dst_path)
+    os.remove(src_path)
+
+
+def test_replace_file(tmpdir):
+    src_path = tmpdir.join('src').strpath
+    dst_path = tmpdir.join('dst').strpath
+    with open(src_path, 'w') as f:
+        f.write('new')
+    with open(dst_path, 'w') as f:
+        f.write('old')
+    with mock.patch('databricks_cli.files.os.rename', side_effect=rename_without_replacing):
+        replace_file(src_path, dst_path)
+    assert not os.path.exists(src_path)
+    with open(dst_path, 'r') as f:
+        assert f.read() == 'new'
+
+
+def test_remove_file(tmpdir):
+    path = tmpdir.join('a').strpath
+    open(path, 'w').close()
+    remove_file(path)
+    assert not os.path.exists(path)
+    remove_file(path)
+
+
+def test_make_dirs(tmpdir):
+    path = tmpdir.join('a', 'b').strpath
+    make_dirs(path)
+    make_dirs(path)
+    assert os.path.isdir(path)
+
+
+def test_evict_least_recently_used(tmpdir):
+    for index, name in enumerate(['a.bin', 'b.bin', 'c.bin', 'd.txt']):
+        path = tmpdir.join(name).strpath
+        with open(path, 'w') as f:
+            f.write('x' * 10)
+        os.utime(path, (index, index))
+
+    evict_least_recently_used(tmpdir.strpath, '.bin', 20, keep_path=tmpdir.join('a.bin').strpath)
+
+    assert sorted(os.path.basename(path) for path, _, _ in stat_files(tmpdir.strpath, '.bin')) \
+        == ['a.bin', 'c.bin']
+    assert os.path.exists(tmpdir.join('d.txt').strpath)
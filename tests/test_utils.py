@@ -21,6 +21,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import time
+
 import pytest
 import mock
 from requests import Response
@@ -68,3 +70,98 @@ def test_json_cli_base_no_args():
 def test_truncate_string():
     assert utils.truncate_string('apple', 3) == 'app...'
     assert utils.truncate_string('apple') == 'apple'
+
+
+def test_prefetch():
+    assert list(utils.prefetch(iter(range(100)), 3)) == range(100)
+    assert list(utils.prefetch(iter([]), 3)) == []
+
+
+def test_prefetch_error():
+    def items():
+        yield 1
+        raise ValueError('test')
+
+    results = utils.prefetch(items(), 3)
+    assert next(results) == 1
+    with pytest.raises(ValueError, match='test'):
+        next(results)
+
+
+def test_prefetch_stops_producing():
+    produced = []
+
+    def items():
+        for i in range(100):
+            produced.append(i)
+            yield i
+
+    results = utils.prefetch(items(), 2)
+    assert next(results) == 0
+    results.close()
+    assert len(produced) < 100
+
+
+def test_parallel_map():
+    assert list(utils.parallel_map(lambda x: x * 2, range(50), 8)) == range(0, 100, 2)
+    assert list(utils.parallel_map(lambda x: x * 2, range(5), 1)) == range(0, 10, 2)
+
+
+def test_parallel_map_slow_items():
+    # Items that take longer than the wait interval are still returned in order.
+    def slow(x):
+        time.sleep(1.2 - 0.2 * x)
+        return x
+
+    assert list(utils.parallel_map(slow, range(2), 2)) == [0, 1]
+
+
+def test_bounded_map():
+    assert list(utils.bounded_map(lambda x: x * 2, range(50), 4)) == range(0, 100, 2)
+    assert list(utils.bounded_map(lambda x: x * 2, range(5), 1)) == range(0, 10, 2)
+
+
+def test_bounded_map_reads_ahead_of_caller_only():
+    started = []
+
+    def function(x):
+        started.append(x)
+        return x
+
+    results = utils.bounded_map(function, range(100), 3)
+    assert next(results) == 0
+    results.close()
+    assert len(started) <= 3
+
+
+def test_leaf_directories():
+    assert utils.leaf_directories(['/a', '/a/b', '/a-b', '/a/b/c', '/d', '/a/e']) == \
+        ['/a/b/c', '/a/e', '/a-b', '/d']
+    assert utils.leaf_directories(['dbfs:/', 'dbfs:/x', 'dbfs:/x/']) == ['dbfs:/x/']
+    assert utils.leaf_directories(['/']) == ['/']
+
+
+def test_mkdirs_leaf_directories():
+    response = Response()
+    response._content = '{"error_code": "RESOURCE_ALREADY_EXISTS"}'
+    calls = []
+
+    def mkdirs(directory):
+        calls.append(directory[0])
+        if directory[0] in ('/a/b/c', '/a/b'):
+            raise HTTPError(response=response)
+
+    dirs = [('/a',), ('/a/b',), ('/a/b/c',), ('/d',)]
+    failed = utils.mkdirs_leaf_directories(dirs, mkdirs, lambda directory: directory[0])
+
+    assert failed == [('/a/b',)]
+    assert calls == ['/a/b/c', '/d', '/a', '/a/b']
+
+
+def test_mkdirs_leaf_directories_raises():
+    def mkdirs(_directory):
+        raise HTTPError(response=Response())
+
+    with pytest.raises(HTTPError):
+        utils.mkdirs_leaf_directories(['/a'], mkdirs, lambda path: path,
+                                      is_conflict=lambda error: False)
@@ -23,6 +23,7 @@
 
 import os
 import mock
+import requests
 from click.testing import CliRunner
 
 import databricks_cli.workspace.cli as cli
@@ -119,13 +120,8 @@ def test_import_dir_helper(tmpdir):
     with mock.patch('databricks_cli.workspace.cli.mkdirs') as mkdirs_mock:
         with mock.patch('databricks_cli.workspace.cli.import_workspace') as import_workspace:
             cli._import_dir_helper(tmpdir.strpath, '/', False, False)
-            # Verify that the directories a, f, g exist.
-            assert mkdirs_mock.call_count == 4
-            # The order of list may be undeterminstic apparently. (It's different in Travis CI)
-            assert any([ca[0][0] == '/' for ca in mkdirs_mock.call_args_list])
-            assert any([ca[0][0] == '/a' for ca in mkdirs_mock.call_args_list])
-            assert any([ca[0][0] == '/f' for ca in mkdirs_mock.call_args_list])
-            assert any([ca[0][0] == '/f/g' for ca in mkdirs_mock.call_args_list])
+            # Verify that only the leaf directories a and f/g are created.
+            assert [ca[0][0] for ca in mkdirs_mock.call_args_list] == ['/a', '/f/g']
             # Verify that we imported the correct files
             assert import_workspace.call_count == 4
             assert any([ca[0][0] == os.path.join(tmpdir.strpath, 'a', 'b.scala') \
@@ -162,9 +158,7 @@ def test_import_dir_rstrip(tmpdir):
     with mock.patch('databricks_cli.workspace.cli.mkdirs') as mkdirs_mock:
         with mock.patch('databricks_cli.workspace.cli.import_workspace') as import_workspace:
             cli._import_dir_helper(tmpdir.strpath, '/', False, False)
-            assert mkdirs_mock.call_count == 2
-            assert any([ca[0][0] == '/' for ca in mkdirs_mock.call_args_list])
-            assert any([ca[0][0] == '/a' for ca in mkdirs_mock.call_args_list])
+            assert [ca[0][0] for ca in mkdirs_mock.call_args_list] == ['/a']
 
             # Verify that we imported the correct files with the right names
             assert import_workspace.call_count == 1
@@ -189,12 +183,43 @@ def test_import_dir_hidden(tmpdir):
     with mock.patch('databricks_cli.workspace.cli.mkdirs') as mkdirs_mock:
         with mock.patch('databricks_cli.workspace.cli.import_workspace') as import_workspace:
             cli._import_dir_helper(tmpdir.strpath, '/', False, True)
-            assert mkdirs_mock.call_count == 2
-            assert any([ca[0][0] == '/' for ca in mkdirs_mock.call_args_list])
-            assert any([ca[0][0] == '/a' for ca in mkdirs_mock.call_args_list])
+            assert [ca[0][0] for ca in mkdirs_mock.call_args_list] == ['/a']
 
             # Verify that we imported the correct files with the right names
             assert import_workspace.call_count == 1
             assert any([ca[0][0] == os.path.join(tmpdir.strpath, 'a', 'test-py.py') \
                     for ca in import_workspace.call_args_list])
             assert any([ca[0][1] == '/a/test-py' for ca in import_workspace.call_args_list])
+
+
+def test_import_dir_mkdirs_fails(tmpdir):
+    """
+    Copy from directory ``tmpdir`` with structure as follows, where f cannot be created
+    - a (directory)
+      - b.py (python)
+    - f (directory)
+      - c.py (python)
+      - g (directory)
+    """
+    os.makedirs(os.path.join(tmpdir.strpath, 'a'))
+    os.makedirs(os.path.join(tmpdir.strpath, 'f', 'g'))
+    for path in [('a', 'b.py'), ('f', 'c.py')]:
+        with open(os.path.join(tmpdir.strpath, *path), 'wb'):
+            pass
+    response = requests.Response()
+    response._content = '{"error_code": "RESOURCE_ALREADY_EXISTS"}'
+
+    def mkdirs(workspace_path):
+        if workspace_path.startswith('/f'):
+            raise requests.exceptions.HTTPError(response=response)
+
+    with mock.patch('databricks_cli.workspace.cli.mkdirs') as mkdirs_mock:
+        with mock.patch('databricks_cli.workspace.cli.import_workspace') as import_workspace:
+            mkdirs_mock.side_effect = mkdirs
+            cli._import_dir_helper(tmpdir.strpath, '/', False, False, jobs=2)
+            calls = [ca[0][0] for ca in mkdirs_mock.call_args_list]
+            assert sorted(calls[:2]) == ['/a', '/f/g']
+            assert calls[2:] == ['/', '/f']
+            import_workspace.assert_called_once_with(os.path.join(tmpdir.strpath, 'a', 'b.py'),
+                                                     '/a/b', WorkspaceLanguage.PYTHON,
+                                                     'SOURCE', False)